@@ -0,0 +1,192 @@
+import threading
+import time
+from collections import deque
+from typing import List, Optional, Tuple
+
+import numpy as np
+from scipy.optimize import nnls
+
+from .converter import AudioConverter, parse_bitrate
+from .metrics import metrics
+
+
+class LinkEstimator:
+    """Rolling estimate of upload throughput to the API.
+
+    Models a successful request as ``latency + bytes / throughput +
+    per_second * audio_seconds``: a fixed cost, the transfer, and server
+    inference, which grows with the length of the audio rather than with its
+    size. The two only separate once uploads with different bytes per audio
+    second (different formats) have been seen, so until then ``identified``
+    is False and the throughput stays at the prior. The fit is non-negative
+    least squares over the last ``window`` uploads.
+    """
+
+    # Reported when the transfer time is lost in the noise
+    MAX_THROUGHPUT = 100 * 1024 * 1024
+
+    def __init__(self, window: int = 20, throughput: float = 256 * 1024, latency: float = 0.3,
+                 alpha: float = 0.3, min_contrast: float = 1.5):
+        self.samples = deque(maxlen=window)
+        self.prior_throughput = throughput
+        self.rtt = None
+        self.alpha = alpha
+        self.prior_latency = latency
+        # Spread in bytes per audio second needed before fitting the throughput
+        self.min_contrast = min_contrast
+        self._lock = threading.Lock()
+
+    def record_upload(self, size: int, seconds: float, elapsed: float):
+        """Add one successful upload of ``size`` bytes holding ``seconds`` of audio."""
+        if seconds <= 0:
+            return
+        with self._lock:
+            self.samples.append((size, seconds, elapsed))
+
+    def record_rtt(self, rtt: float):
+        with self._lock:
+            self.rtt = rtt if self.rtt is None else self.alpha * rtt + (1 - self.alpha) * self.rtt
+
+    def ratios(self) -> List[float]:
+        """Bytes per audio second of the uploads in the window."""
+        with self._lock:
+            return [size / seconds for size, seconds, _ in self.samples]
+
+    def estimate(self) -> dict:
+        """Current ``latency`` and ``per_second`` (seconds), ``throughput`` (bytes/s) and ``identified``."""
+        with self._lock:
+            samples = list(self.samples)
+            rtt = self.rtt
+        latency = rtt if rtt is not None else self.prior_latency
+        prior = {'latency': latency, 'throughput': self.prior_throughput, 'per_second': 0.0, 'identified': False}
+        if len(samples) < 3:
+            return prior
+        kilobytes = np.array([size for size, _, _ in samples], dtype=float) / 1024
+        seconds = np.array([seconds for _, seconds, _ in samples], dtype=float)
+        elapsed = np.array([elapsed for _, _, elapsed in samples], dtype=float)
+        ratios = kilobytes / seconds
+        if ratios.max() < self.min_contrast * ratios.min():
+            # Every upload used about the same format: transfer and server
+            # time grow together and can't be told apart
+            return prior
+
+        columns = [np.ones(len(samples)), kilobytes]
+        # With clips of the same length the inference term folds into the constant
+        varied = seconds.max() > 1.2 * seconds.min()
+        if varied:
+            columns.append(seconds)
+        coefficients, _ = nnls(np.column_stack(columns), elapsed)
+        per_kilobyte = coefficients[1]
+        return {
+            'latency': float(coefficients[0]),
+            'throughput': float(1024 / per_kilobyte) if per_kilobyte > 1024 / self.MAX_THROUGHPUT else self.MAX_THROUGHPUT,
+            'per_second': float(coefficients[2]) if varied else 0.0,
+            'identified': True,
+        }
+
+
+class BitratePolicy:
+    """Pick the upload format that gets a transcript back soonest.
+
+    For a given clip the server's processing time doesn't depend on the
+    format, so options are compared on encode time plus transfer time.
+    Options within ``tolerance`` of the fastest count as equally fast and
+    the best-quality one of those wins; lossy options below
+    ``min_bitrate`` are never used.
+    """
+
+    # (codec, bitrate) from best to worst quality; FLAC is lossless
+    OPTIONS = (
+        ('flac', None),
+        ('opus', '32k'),
+        ('opus', '24k'),
+        ('mp3', '32k'),
+        ('opus', '16k'),
+        ('mp3', '16k'),
+        ('opus', '12k'),
+        ('opus', '8k'),
+    )
+
+    # Starting guesses for encode seconds per audio second, refined as jobs run
+    ENCODE_COST = {'flac': 0.002, 'opus': 0.05, 'mp3': 0.02}
+    # mp3 also pays for starting ffmpeg
+    ENCODE_OVERHEAD = {'mp3': 0.05}
+
+    def __init__(self, link: LinkEstimator, min_bitrate: str = '12k', tolerance: float = 0.1,
+                 alpha: float = 0.3):
+        self.link = link
+        self.min_bitrate = parse_bitrate(min_bitrate)
+        self.tolerance = tolerance
+        self.alpha = alpha
+        self.encode_cost = dict(self.ENCODE_COST)
+        # FLAC size as a fraction of the raw PCM, learnt from each FLAC encode
+        self.flac_ratio = 0.6
+
+    def _available(self):
+        for codec, bitrate in self.OPTIONS:
+            if bitrate is not None and parse_bitrate(bitrate) < self.min_bitrate:
+                continue
+            try:
+                AudioConverter.codec(codec, fallback=False)
+            except RuntimeError:
+                continue
+            yield codec, bitrate
+
+    def expected_size(self, codec: str, bitrate: Optional[str], seconds: float, sample_rate: int, channels: int) -> float:
+        if bitrate is None:
+            return seconds * sample_rate * channels * 2 * self.flac_ratio
+        return seconds * parse_bitrate(bitrate) / 8
+
+    def choose(self, seconds: float, sample_rate: int = 16000, channels: int = 1) -> dict:
+        link = self.link.estimate()
+        options = []
+        for codec, bitrate in self._available():
+            size = self.expected_size(codec, bitrate, seconds, sample_rate, channels)
+            encode = self.encode_cost[codec] * seconds + self.ENCODE_OVERHEAD.get(codec, 0.0)
+            options.append({
+                'codec': codec,
+                'bitrate': bitrate,
+                'expected_bytes': int(size),
+                'expected_seconds': link['latency'] + link['per_second'] * seconds + encode + size / link['throughput'],
+            })
+        if not options:
+            raise RuntimeError("No codec available above the quality floor")
+        seen = self.link.ratios() if not link['identified'] else []
+        if seen and seconds > 0:
+            # Probe: send this clip in the format least like the ones seen so
+            # far, so transfer time can be told apart from server time
+            choice = max(options, key=lambda option: min(
+                abs(np.log(option['expected_bytes'] / seconds / ratio)) for ratio in seen))
+        else:
+            fastest = min(option['expected_seconds'] for option in options)
+            # OPTIONS is ordered by quality, so the first close enough wins
+            choice = next(option for option in options
+                          if option['expected_seconds'] <= fastest * (1 + self.tolerance))
+        choice.update(seconds=seconds, latency=link['latency'], throughput=link['throughput'],
+                      probe=bool(seen))
+        return choice
+
+    def encode(self, pcm, sample_rate: int = 16000, channels: int = 1) -> Tuple[bytes, str, dict]:
+        """Encode ``pcm`` in the chosen format and learn from it.
+
+        Returns ``(data, suffix, choice)``; ``choice`` is the dict from ``choose()``.
+        """
+        seconds = len(pcm) / (sample_rate * channels * 2)
+        choice = self.choose(seconds, sample_rate, channels)
+        codec = AudioConverter.codec(choice['codec'], fallback=False)
+        with metrics.span('adaptive.encode', **choice) as span:
+            started = time.perf_counter()
+            data = codec.encode(pcm, sample_rate, channels, choice['bitrate'] or '16k')
+            elapsed = time.perf_counter() - started
+            span.set(encoded_bytes=len(data))
+
+        if seconds > 0.5:
+            cost = elapsed / seconds
+            self.encode_cost[codec.name] = self.alpha * cost + (1 - self.alpha) * self.encode_cost[codec.name]
+            if codec.name == 'flac':
+                ratio = len(data) / len(pcm)
+                self.flac_ratio = self.alpha * ratio + (1 - self.alpha) * self.flac_ratio
+        link = "probing link" if choice['probe'] else f"link {choice['throughput'] / 1024:.0f} KB/s"
+        print(f"Upload format: {codec.name} {choice['bitrate'] or 'lossless'} for {seconds:.1f}s "
+              f"({link}, latency {choice['latency']:.2f}s, expected {choice['expected_seconds']:.2f}s)")
+        return data, codec.suffix, choice
@@ -0,0 +1,106 @@
+import os
+from pathlib import Path
+from typing import Optional
+
+BACKENDS = {}
+
+CONTENT_TYPES = {
+    '.mp3': 'audio/mpeg',
+    '.wav': 'audio/wav',
+    '.ogg': 'audio/ogg',
+    '.opus': 'audio/ogg',
+    '.flac': 'audio/flac',
+    '.m4a': 'audio/mp4',
+}
+
+
+def sniff_suffix(data) -> Optional[str]:
+    """Guess the file type of encoded audio from its first bytes."""
+    head = bytes(data[:12])
+    if head.startswith(b'OggS'):
+        return '.ogg'
+    if head.startswith(b'fLaC'):
+        return '.flac'
+    if head.startswith(b'RIFF') and head[8:12] == b'WAVE':
+        return '.wav'
+    if head[4:8] == b'ftyp':
+        return '.m4a'
+    if head.startswith(b'ID3') or (len(head) > 1 and head[0] == 0xFF and head[1] & 0xE0 == 0xE0):
+        return '.mp3'
+    return None
+
+
+def register_backend(name: str):
+    """Class decorator adding a backend to the registry under ``name``."""
+    def decorator(cls):
+        cls.name = name
+        BACKENDS[name] = cls
+        return cls
+    return decorator
+
+
+def get_backend(name: str, **options) -> 'TranscriptionBackend':
+    try:
+        backend_class = BACKENDS[name]
+    except KeyError:
+        raise ValueError(f"Unknown transcription backend: {name} (available: {', '.join(sorted(BACKENDS))})")
+    return backend_class(**options)
+
+
+class TranscriptionBackend:
+    """An OpenAI-style multipart ``/audio/transcriptions`` endpoint.
+
+    Subclasses set the endpoint, model and the environment variable holding
+    the API key, and may override how requests are built or responses read.
+    """
+
+    name = None
+    api_url = None
+    model = None
+    api_key_env = None
+
+    def __init__(self, api_url: Optional[str] = None, model: Optional[str] = None, api_key: Optional[str] = None):
+        self.api_url = api_url or self.api_url
+        self.model = model or self.model
+        self.api_key = api_key
+        if self.api_key is None and self.api_key_env:
+            self.api_key = os.getenv(self.api_key_env)
+            if not self.api_key:
+                raise ValueError(f"{self.api_key_env} not found in environment variables")
+
+    def headers(self) -> dict:
+        return {"Authorization": f"Bearer {self.api_key}"} if self.api_key else {}
+
+    def form_data(self, language: str) -> dict:
+        return {
+            'model': self.model,
+            'language': language,
+            'response_format': 'text'
+        }
+
+    def content_type(self, filename: str) -> str:
+        return CONTENT_TYPES.get(Path(filename).suffix.lower(), 'application/octet-stream')
+
+    def parse(self, response) -> str:
+        return response.text.strip()
+
+
+@register_backend('deepinfra')
+class DeepinfraBackend(TranscriptionBackend):
+    api_url = "https://api.deepinfra.com/v1/openai/audio/transcriptions"
+    model = 'mistralai/Voxtral-Mini-3B-2507'
+    api_key_env = 'DEEPINFRA_API_KEY'
+
+
+@register_backend('openai')
+class OpenAIBackend(TranscriptionBackend):
+    api_url = "https://api.openai.com/v1/audio/transcriptions"
+    model = 'whisper-1'
+    api_key_env = 'OPENAI_API_KEY'
+
+
+@register_backend('local')
+class LocalBackend(TranscriptionBackend):
+    """Talks to ``parle fake-server`` (see parle.fake_server); no API key needed."""
+    api_url = "http://127.0.0.1:8765/v1/audio/transcriptions"
+    model = 'fake'
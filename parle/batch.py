@@ -0,0 +1,132 @@
+import glob
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from pathlib import Path
+from typing import Iterable, List
+
+from .converter import AudioConverter
+
+AUDIO_SUFFIXES = ('.mp3', '.wav', '.ogg', '.opus', '.flac', '.m4a')
+
+
+def expand_inputs(patterns: Iterable[str]) -> List[Path]:
+    """Resolve files, directories and glob patterns into a sorted list of audio files."""
+    paths = set()
+    for pattern in patterns:
+        matches = glob.glob(pattern, recursive=True) or [pattern]
+        for match in matches:
+            path = Path(match)
+            if path.is_dir():
+                paths.update(p for p in path.iterdir() if p.suffix.lower() in AUDIO_SUFFIXES)
+            elif path.is_file():
+                paths.add(path)
+    return sorted(paths)
+
+
+class RateLimiter:
+    """Space calls out to at most ``rate`` per second across all threads."""
+
+    def __init__(self, rate: float):
+        self.interval = 1.0 / rate if rate > 0 else 0.0
+        self._next = 0.0
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        if not self.interval:
+            return
+        with self._lock:
+            now = time.monotonic()
+            wait = self._next - now
+            self._next = max(now, self._next) + self.interval
+        if wait > 0:
+            time.sleep(wait)
+
+
+class BatchTranscriber:
+    """Transcribe many files concurrently, appending one JSON line per file.
+
+    Files that already have a successful result in ``output_path`` are
+    skipped, so an interrupted run can simply be started again. ``rate``
+    caps HTTP requests per second, counting every segment of a long file
+    and every retry.
+    """
+
+    def __init__(self, transcriber, output_path: Path, workers: int = 4, rate: float = 0.0):
+        self.transcriber = transcriber
+        self.output_path = output_path
+        self.workers = workers
+        self.limiter = RateLimiter(rate)
+        transcriber.rate_limiter = self.limiter
+
+    def completed(self) -> set:
+        done = set()
+        if not self.output_path.exists():
+            return done
+        with open(self.output_path, 'r', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    # A torn last line from an interrupted run
+                    continue
+                if entry.get('text') is not None:
+                    done.add(Path(entry['file']).resolve())
+        return done
+
+    def _torn(self) -> bool:
+        """True if the output ends in a line cut short by an interrupted run."""
+        try:
+            with open(self.output_path, 'rb') as f:
+                f.seek(-1, os.SEEK_END)
+                return f.read(1) != b'\n'
+        except OSError:
+            # Missing or empty
+            return False
+
+    def _transcribe(self, path: Path) -> dict:
+        started = time.perf_counter()
+        entry = {'file': str(path), 'duration': AudioConverter.duration(path)}
+        try:
+            entry['text'] = self.transcriber.transcribe(path)
+        except Exception as e:
+            entry['text'] = None
+            entry['error'] = str(e)
+        entry['elapsed'] = round(time.perf_counter() - started, 3)
+        entry['attempts'] = len(self.transcriber.last_attempts)
+        if entry['text'] is None and 'error' not in entry:
+            entry['error'] = 'transcription failed'
+        return entry
+
+    def run(self, files: List[Path]) -> dict:
+        done = self.completed()
+        pending = [path for path in files if path.resolve() not in done]
+        stats = {'total': len(files), 'skipped': len(files) - len(pending), 'ok': 0, 'failed': 0,
+                 'audio_seconds': 0.0, 'wall_seconds': 0.0}
+
+        started = time.perf_counter()
+        torn = self._torn()
+        with open(self.output_path, 'a', encoding='utf-8') as out, \
+                ThreadPoolExecutor(max_workers=self.workers) as pool:
+            if torn:
+                # Otherwise the first new entry would be glued onto it and lost
+                out.write('\n')
+            futures = {pool.submit(self._transcribe, path): path for path in pending}
+            for index, future in enumerate(as_completed(futures), 1):
+                entry = future.result()
+                out.write(json.dumps(entry, ensure_ascii=False) + '\n')
+                out.flush()
+
+                if entry['text'] is None:
+                    stats['failed'] += 1
+                    status = f"failed ({entry['error']})"
+                else:
+                    stats['ok'] += 1
+                    stats['audio_seconds'] += entry['duration'] or 0.0
+                    status = 'ok'
+                print(f"[{index}/{len(pending)}] {entry['file']}: {status}")
+
+        stats['wall_seconds'] = time.perf_counter() - started
+        return stats
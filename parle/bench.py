@@ -0,0 +1,251 @@
+import json
+import platform
+import sys
+import time
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from .adaptive import BitratePolicy
+from .converter import CODECS, AudioConverter
+from .fake_server import FakeTranscriptionServer
+from .recorder import AudioRecorder
+from .transcriber import AudioTranscriber
+
+STAGES = (
+    'recorder_init',
+    'stream_open',
+    'capture',
+    'wav_write',
+    'wav_to_mp3',
+    'pcm_to_mp3_bytes',
+    'encode_opus',
+    'encode_flac',
+    'encode_auto',
+    'upload',
+    'paste',
+)
+
+
+def synthetic_speech(seconds: float, sample_rate: int = 44100, seed: int = 0) -> np.ndarray:
+    """Speech-like 16-bit mono test signal: voiced bursts, syllable rhythm and pauses."""
+    rng = np.random.default_rng(seed)
+    t = np.arange(int(seconds * sample_rate)) / sample_rate
+    voice = (np.sin(2 * np.pi * 160 * t)
+             + 0.5 * np.sin(2 * np.pi * 320 * t)
+             + 0.25 * np.sin(2 * np.pi * 640 * t))
+    syllables = 0.5 * (1 + np.sin(2 * np.pi * 4 * t))
+    # Half-second pause every three seconds
+    phrases = (t % 3.0) < 2.5
+    noise = rng.normal(0, 0.02, len(t))
+    signal = voice * syllables * phrases * 0.3 + noise
+    return (np.clip(signal, -1, 1) * 32767).astype(np.int16)
+
+
+def percentiles(values: List[float]) -> dict:
+    data = np.asarray(values)
+    return {
+        'n': len(values),
+        'mean': float(data.mean()),
+        'p50': float(np.percentile(data, 50)),
+        'p95': float(np.percentile(data, 95)),
+        'p99': float(np.percentile(data, 99)),
+    }
+
+
+class PipelineBenchmark:
+    """Time each stage of record -> encode -> transcribe -> paste on synthetic audio.
+
+    The real AudioRecorder, AudioConverter and AudioTranscriber are used;
+    capture is fed synthetic chunks and uploads go to a local
+    FakeTranscriptionServer, so results don't depend on a microphone or the
+    network. Stages that can't run here (no input device, no ffmpeg, no
+    clipboard) are reported as skipped.
+
+    With ``device_rate`` set, the synthetic audio is generated at that rate
+    and resampled to ``sample_rate`` during capture, as on a real device.
+    """
+
+    def __init__(self, lengths=(5, 30, 120), iterations: int = 5, sample_rate: int = 44100,
+                 bitrate: str = "16k", latency: float = 0.0, device_rate: Optional[int] = None,
+                 codec: str = 'mp3', throughput: Optional[float] = None):
+        self.lengths = lengths
+        self.iterations = iterations
+        self.sample_rate = sample_rate
+        self.device_rate = device_rate or sample_rate
+        # Which of the encoded payloads is uploaded; 'auto' lets a
+        # BitratePolicy choose, learning from the uploads as it goes
+        self.codec = codec
+        # Upload bandwidth cap of the mock API in bytes/s
+        self.throughput = throughput
+        self.policy = None
+        self.formats = {}
+        self.bitrate = bitrate
+        self.latency = latency
+        self.skipped = {}
+        self.payload_bytes = {}
+
+    @contextmanager
+    def _stage(self, timings: Dict[str, List[float]], name: str):
+        # Only successful stages are recorded: an exception skips the append
+        started = time.perf_counter()
+        yield
+        timings.setdefault(name, []).append(time.perf_counter() - started)
+
+    def _skip(self, stage: str, error: Exception):
+        self.skipped.setdefault(stage, str(error))
+
+    def _iteration(self, samples: np.ndarray, transcriber: AudioTranscriber, timings: Dict[str, List[float]],
+                   payloads: List[int], formats: List[str]):
+        with self._stage(timings, 'recorder_init'):
+            recorder = AudioRecorder(sample_rate=self.sample_rate, device_rate=self.device_rate)
+        try:
+            try:
+                with self._stage(timings, 'stream_open'):
+                    recorder.open_stream()
+            except Exception as e:
+                self._skip('stream_open', e)
+            if recorder.stream:
+                recorder.stream.close()
+                recorder.stream = None
+
+            # Feed the capture path exactly as the recording thread would
+            recorder.buffer.clear()
+            pcm = samples.tobytes()
+            chunk_bytes = recorder.chunk_size * 2
+            with self._stage(timings, 'capture'):
+                for offset in range(0, len(pcm), chunk_bytes):
+                    recorder._store(pcm[offset:offset + chunk_bytes])
+                if recorder.resampler:
+                    recorder._append(recorder.resampler.flush())
+
+            with self._stage(timings, 'wav_write'):
+                wav_path = recorder.write_wav(recorder.buffer.view())
+            try:
+                mp3_path = wav_path.with_suffix('.mp3')
+                try:
+                    with self._stage(timings, 'wav_to_mp3'):
+                        AudioConverter.wav_to_mp3(wav_path, mp3_path, self.bitrate)
+                except RuntimeError as e:
+                    self._skip('wav_to_mp3', e)
+                AudioConverter.cleanup_temp_file(mp3_path)
+            finally:
+                AudioConverter.cleanup_temp_file(wav_path)
+
+            encoded = {}
+            try:
+                with self._stage(timings, 'pcm_to_mp3_bytes'):
+                    with recorder.buffer.view() as view:
+                        encoded['mp3'] = AudioConverter.pcm_to_mp3_bytes(view, self.sample_rate, 1, self.bitrate)
+            except RuntimeError as e:
+                self._skip('pcm_to_mp3_bytes', e)
+            for name in ('opus', 'flac'):
+                try:
+                    codec = AudioConverter.codec(name, fallback=False)
+                    with self._stage(timings, f'encode_{name}'):
+                        with recorder.buffer.view() as view:
+                            encoded[name] = codec.encode(view, self.sample_rate, 1, self.bitrate)
+                except RuntimeError as e:
+                    self._skip(f'encode_{name}', e)
+
+            if self.codec == 'auto':
+                with self._stage(timings, 'encode_auto'):
+                    with recorder.buffer.view() as view:
+                        audio, suffix, choice = self.policy.encode(view, self.sample_rate, 1)
+                filename = 'bench' + suffix
+                formats.append(f"{choice['codec']} {choice['bitrate'] or 'lossless'}")
+            elif self.codec in encoded:
+                audio = encoded[self.codec]
+                filename = 'bench' + CODECS[self.codec].suffix
+            else:
+                # Still exercise the upload, with an equivalently sized payload
+                audio = pcm[:int(len(samples) / self.device_rate * 2000)]
+                filename = 'bench.bin'
+            payloads.append(len(audio))
+
+            with self._stage(timings, 'upload'):
+                text = transcriber.transcribe(audio, filename)
+
+            try:
+                import pyperclip
+                with self._stage(timings, 'paste'):
+                    pyperclip.copy(text or '')
+            except Exception as e:
+                self._skip('paste', e)
+        finally:
+            recorder.cleanup()
+
+    def run(self) -> dict:
+        server = FakeTranscriptionServer(port=0, latency=self.latency, throughput=self.throughput).start()
+        transcriber = AudioTranscriber(backend='local', api_url=server.url, max_retries=0)
+        self.policy = BitratePolicy(transcriber.link)
+        results = {}
+        try:
+            for length in self.lengths:
+                samples = synthetic_speech(length, self.device_rate)
+                timings = {}
+                payloads = []
+                formats = []
+                for _ in range(self.iterations):
+                    self._iteration(samples, transcriber, timings, payloads, formats)
+                results[f"{length:g}"] = {
+                    stage: percentiles(timings[stage]) for stage in STAGES if timings.get(stage)
+                }
+                self.payload_bytes[f"{length:g}"] = int(np.median(payloads))
+                if formats:
+                    self.formats[f"{length:g}"] = formats
+        finally:
+            transcriber.close()
+            server.stop()
+
+        return {
+            'timestamp': datetime.now().isoformat(timespec='seconds'),
+            'platform': platform.platform(),
+            'python': sys.version.split()[0],
+            'sample_rate': self.sample_rate,
+            'device_rate': self.device_rate,
+            'bitrate': self.bitrate,
+            'codec': self.codec,
+            'throughput': self.throughput,
+            'formats': self.formats,
+            'server_latency': self.latency,
+            'iterations': self.iterations,
+            'results': results,
+            'payload_bytes': self.payload_bytes,
+            'skipped': self.skipped,
+        }
+
+
+def save_results(report: dict, output: Optional[Path] = None) -> Path:
+    if output is None:
+        bench_dir = Path.home() / '.parle' / 'bench'
+        bench_dir.mkdir(parents=True, exist_ok=True)
+        output = bench_dir / f"bench_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
+    with open(output, 'w') as f:
+        json.dump(report, f, indent=2)
+    return output
+
+
+def format_report(report: dict, baseline: Optional[dict] = None) -> str:
+    """Render per-stage percentiles in ms, with the p50 change against ``baseline`` if given."""
+    lines = []
+    for length, stages in report['results'].items():
+        payload = report.get('payload_bytes', {}).get(length)
+        lines.append(f"\n{length}s of audio" + (f" ({payload / 1024:.1f} KB uploaded)" if payload else ""))
+        formats = report.get('formats', {}).get(length)
+        if formats:
+            lines.append(f"  formats chosen: {', '.join(formats)}")
+        lines.append(f"  {'stage':<18}{'p50':>10}{'p95':>10}{'p99':>10}" + ("   p50 vs baseline" if baseline else ""))
+        for stage, stats in stages.items():
+            line = f"  {stage:<18}" + "".join(f"{stats[p] * 1000:>8.1f}ms" for p in ('p50', 'p95', 'p99'))
+            previous = (baseline or {}).get('results', {}).get(length, {}).get(stage)
+            if previous and previous['p50']:
+                change = (stats['p50'] - previous['p50']) / previous['p50'] * 100
+                line += f"   {change:+.1f}%"
+            lines.append(line)
+    for stage, reason in report.get('skipped', {}).items():
+        lines.append(f"\nSkipped {stage}: {reason}")
+    return "\n".join(lines)
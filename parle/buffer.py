@@ -0,0 +1,97 @@
+import numpy as np
+
+
+class PCMBuffer:
+    """Contiguous, growable store for interleaved 16-bit PCM.
+
+    Chunks are copied into one preallocated ``bytearray`` instead of being kept
+    as a list of ``bytes`` objects, so a recording costs close to its raw PCM
+    size and can be handed out without a final join.
+    """
+
+    # Stop doubling past this step so long sessions don't overshoot by 2x
+    MAX_GROWTH = 32 * 1024 * 1024
+
+    def __init__(self, capacity: int = 1024 * 1024):
+        self._data = bytearray(max(capacity, 1))
+        self._length = 0
+
+    def __len__(self):
+        return self._length
+
+    @property
+    def capacity(self) -> int:
+        return len(self._data)
+
+    def append(self, data):
+        end = self._length + len(data)
+        if end > len(self._data):
+            self._grow(end)
+        self._data[self._length:end] = data
+        self._length = end
+
+    def _grow(self, needed: int):
+        capacity = len(self._data)
+        new_capacity = max(needed, capacity + min(capacity, self.MAX_GROWTH))
+        # Fails with BufferError while a view() or as_array() is still alive
+        self._data.extend(bytes(new_capacity - capacity))
+
+    def clear(self):
+        self._length = 0
+
+    def view(self) -> memoryview:
+        """Zero-copy view of the recorded bytes.
+
+        Release it (or use it as a context manager) before appending again,
+        since the buffer cannot grow while views are exported.
+        """
+        return memoryview(self._data)[:self._length]
+
+    def as_array(self, dtype=np.int16) -> np.ndarray:
+        """Zero-copy numpy view of the recorded samples."""
+        itemsize = np.dtype(dtype).itemsize
+        return np.frombuffer(self._data, dtype=dtype, count=self._length // itemsize)
+
+    def tobytes(self) -> bytes:
+        with self.view() as view:
+            return view.tobytes()
+
+
+class RingBuffer:
+    """Fixed-size store that keeps only the most recent ``capacity`` bytes of PCM."""
+
+    def __init__(self, capacity: int):
+        self._data = bytearray(max(capacity, 1))
+        self._start = 0
+        self._length = 0
+
+    def __len__(self):
+        return self._length
+
+    def append(self, data):
+        capacity = len(self._data)
+        if len(data) >= capacity:
+            self._data[:] = data[len(data) - capacity:]
+            self._start, self._length = 0, capacity
+            return
+        end = (self._start + self._length) % capacity
+        first = min(len(data), capacity - end)
+        self._data[end:end + first] = data[:first]
+        self._data[:len(data) - first] = data[first:]
+        overflow = self._length + len(data) - capacity
+        if overflow > 0:
+            self._start = (self._start + overflow) % capacity
+            self._length = capacity
+        else:
+            self._length += len(data)
+
+    def clear(self):
+        self._start = 0
+        self._length = 0
+
+    def tobytes(self) -> bytes:
+        """The buffered bytes, oldest first."""
+        end = self._start + self._length
+        if end <= len(self._data):
+            return bytes(self._data[self._start:end])
+        return bytes(self._data[self._start:]) + bytes(self._data[:end - len(self._data)])
@@ -0,0 +1,95 @@
+import hashlib
+import os
+import threading
+from pathlib import Path
+from typing import Optional, Union
+
+from .converter import AudioConverter
+
+
+class TranscriptionCache:
+    """Content-addressed on-disk cache of transcripts.
+
+    Entries are keyed by a hash of the decoded PCM plus language and model, so
+    the same audio hits the cache whatever container or file name it came in.
+    Writes are atomic renames, hits refresh the entry's mtime, and once the
+    cache grows past ``max_bytes`` the least recently used entries are evicted.
+    Several processes may share one cache directory.
+    """
+
+    def __init__(self, cache_dir: Optional[Path] = None, max_bytes: int = 64 * 1024 * 1024):
+        self.cache_dir = cache_dir or Path.home() / '.parle' / 'cache'
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._size = None
+        self._lock = threading.Lock()
+
+    def key(self, audio: Union[Path, bytes], language: str, model: str) -> str:
+        digest = hashlib.sha256()
+        try:
+            for chunk in AudioConverter.iter_decoded(audio):
+                digest.update(chunk)
+        except RuntimeError:
+            # Neither libsndfile nor ffmpeg can read it: hash the encoded bytes
+            digest = hashlib.sha256(b'raw\0')
+            digest.update(audio if isinstance(audio, (bytes, bytearray, memoryview)) else Path(audio).read_bytes())
+        digest.update(f"\0{language}\0{model}".encode())
+        return digest.hexdigest()
+
+    def _path(self, key: str) -> Path:
+        return self.cache_dir / key[:2] / f"{key}.txt"
+
+    def get(self, key: str) -> Optional[str]:
+        path = self._path(key)
+        try:
+            text = path.read_text(encoding='utf-8')
+            os.utime(path)
+        except OSError:
+            with self._lock:
+                self.misses += 1
+            return None
+        with self._lock:
+            self.hits += 1
+        return text
+
+    def put(self, key: str, text: str):
+        path = self._path(key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        temp = path.with_name(f"{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+        temp.write_text(text, encoding='utf-8')
+        os.replace(temp, path)
+
+        with self._lock:
+            if self._size is None:
+                self._size = self._scan_size()
+            else:
+                self._size += path.stat().st_size
+            if self._size > self.max_bytes:
+                self._evict()
+
+    def _entries(self):
+        for path in self.cache_dir.glob('*/*.txt'):
+            try:
+                yield path, path.stat()
+            except OSError:
+                # Removed by another process in the meantime
+                continue
+
+    def _scan_size(self) -> int:
+        return sum(stat.st_size for _, stat in self._entries())
+
+    def _evict(self):
+        # Trim to 90% of the cap so we don't rescan on every put
+        entries = sorted(self._entries(), key=lambda entry: entry[1].st_mtime)
+        size = sum(stat.st_size for _, stat in entries)
+        target = self.max_bytes * 0.9
+        for path, stat in entries:
+            if size <= target:
+                break
+            path.unlink(missing_ok=True)
+            size -= stat.st_size
+        self._size = size
+
+    def stats(self) -> str:
+        return f"{self.hits} hit{'s' if self.hits != 1 else ''}, {self.misses} miss{'es' if self.misses != 1 else ''}"
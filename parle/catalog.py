@@ -0,0 +1,141 @@
+import atexit
+import queue
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import List, Optional
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS recordings (
+    id INTEGER PRIMARY KEY,
+    created REAL NOT NULL,
+    source TEXT,
+    path TEXT,
+    duration REAL,
+    codec TEXT,
+    bitrate TEXT,
+    language TEXT,
+    backend TEXT,
+    latency REAL,
+    text TEXT
+);
+CREATE INDEX IF NOT EXISTS recordings_created ON recordings(created);
+CREATE VIRTUAL TABLE IF NOT EXISTS transcripts USING fts5(
+    text, content='recordings', content_rowid='id'
+);
+CREATE TRIGGER IF NOT EXISTS recordings_ai AFTER INSERT ON recordings WHEN new.text IS NOT NULL BEGIN
+    INSERT INTO transcripts(rowid, text) VALUES (new.id, new.text);
+END;
+CREATE TRIGGER IF NOT EXISTS recordings_ad AFTER DELETE ON recordings WHEN old.text IS NOT NULL BEGIN
+    INSERT INTO transcripts(transcripts, rowid, text) VALUES ('delete', old.id, old.text);
+END;
+"""
+
+COLUMNS = ('created', 'source', 'path', 'duration', 'codec', 'bitrate', 'language', 'backend', 'latency', 'text')
+
+
+def catalog_path() -> Path:
+    return Path.home() / '.parle' / 'catalog.db'
+
+
+def fts_query(query: str) -> str:
+    """Quote each word so punctuation in the query can't break the FTS5 syntax."""
+    return ' '.join('"' + word.replace('"', '""') + '"' for word in query.split())
+
+
+class Catalog:
+    """SQLite catalog of recordings and transcripts with full-text search.
+
+    ``add()`` only queues the entry; a writer thread inserts queued entries
+    in one transaction every ``flush_interval`` seconds (or once
+    ``batch_size`` are waiting), so recording and pasting never wait on
+    disk. Transcripts are indexed with FTS5. The database runs in WAL mode,
+    so ``search()`` and several processes (tray, CLI, daemon) can use it
+    while another one writes.
+    """
+
+    def __init__(self, path: Optional[Path] = None, flush_interval: float = 1.0, batch_size: int = 64):
+        self.path = path or catalog_path()
+        self.flush_interval = flush_interval
+        self.batch_size = batch_size
+        self._queue = queue.Queue()
+        self._writer = None
+        self._lock = threading.Lock()
+        self._schema_ready = False
+
+    def connect(self) -> sqlite3.Connection:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        connection = sqlite3.connect(str(self.path), timeout=10)
+        connection.row_factory = sqlite3.Row
+        if not self._schema_ready:
+            connection.execute('PRAGMA journal_mode=WAL')
+            connection.executescript(SCHEMA)
+            self._schema_ready = True
+        return connection
+
+    def add(self, **entry):
+        """Queue one recording for the catalog; keys are the column names."""
+        entry.setdefault('created', time.time())
+        self._queue.put(tuple(entry.get(column) for column in COLUMNS))
+        with self._lock:
+            if self._writer is None:
+                self._writer = threading.Thread(target=self._write_loop, daemon=True)
+                self._writer.start()
+                atexit.register(self.flush)
+
+    def _write_loop(self):
+        connection = None
+        while True:
+            rows = [self._queue.get()]
+            deadline = time.monotonic() + self.flush_interval
+            while len(rows) < self.batch_size:
+                timeout = deadline - time.monotonic()
+                if timeout <= 0:
+                    break
+                try:
+                    rows.append(self._queue.get(timeout=timeout))
+                except queue.Empty:
+                    break
+            try:
+                connection = connection or self.connect()
+                with connection:
+                    connection.executemany(
+                        f"INSERT INTO recordings ({', '.join(COLUMNS)}) VALUES ({', '.join('?' * len(COLUMNS))})",
+                        rows
+                    )
+            except (sqlite3.Error, OSError) as e:
+                print(f"Catalog write failed, {len(rows)} entries lost: {e}")
+            for _ in rows:
+                self._queue.task_done()
+
+    def flush(self):
+        """Wait until every queued entry has been written."""
+        if self._writer is not None:
+            self._queue.join()
+
+    def search(self, query: str = '', limit: int = 20) -> List[dict]:
+        """Best matches for ``query`` first, or the most recent entries if it is empty."""
+        connection = self.connect()
+        try:
+            if query.strip():
+                rows = connection.execute(
+                    "SELECT recordings.*, snippet(transcripts, 0, '[', ']', '...', 12) AS snippet "
+                    "FROM transcripts JOIN recordings ON recordings.id = transcripts.rowid "
+                    "WHERE transcripts MATCH ? ORDER BY rank LIMIT ?",
+                    (fts_query(query), limit)
+                ).fetchall()
+            else:
+                rows = connection.execute(
+                    "SELECT *, text AS snippet FROM recordings ORDER BY created DESC LIMIT ?", (limit,)
+                ).fetchall()
+            return [dict(row) for row in rows]
+        finally:
+            connection.close()
+
+    def count(self) -> int:
+        connection = self.connect()
+        try:
+            return connection.execute("SELECT COUNT(*) FROM recordings").fetchone()[0]
+        finally:
+            connection.close()
@@ -1,17 +1,66 @@
 import click
+import json
+import os
+import shutil
 import threading
 import sys
+import time
 from pathlib import Path
 from datetime import datetime
-import pyaudio
 
-from .recorder import AudioRecorder
-from .converter import AudioConverter
-from .player import AudioPlayer
-from .transcriber import AudioTranscriber
+# Only light modules at import time: a run handed to `parle serve` never
+# needs numpy, scipy, soundfile or requests. The rest is imported on use.
+from .client import DaemonClient
+from .config import Config
+from .metrics import setup_metrics
 
 
-@click.command()
+def create_transcriber(language, backend=None, cache=None, max_segment=None):
+    """Build a transcriber for the backend given on the command line or in the config"""
+    from .transcriber import AudioTranscriber
+    config = Config()
+    return AudioTranscriber(
+        language=language,
+        cache=cache,
+        backend=backend or config.get('backend', 'deepinfra'),
+        api_url=config.get('api_url'),
+        max_segment=max_segment or config.get('max_segment', 120),
+        max_workers=config.get('transcribe_workers', 4)
+    )
+
+
+def register_session(**entry):
+    """Add a recording to the catalog searched by `parle search`; written in the background"""
+    if Config().get('catalog', True):
+        from .catalog import Catalog
+        Catalog().add(source='cli', **entry)
+
+
+def print_transcription(audio, language, use_cache=True, backend=None, max_segment=None, **entry):
+    """Transcribe and print ``audio``, then catalog it with ``entry`` (path, duration, ...)"""
+    from .cache import TranscriptionCache
+    cache = TranscriptionCache() if use_cache else None
+    transcription = None
+    started = time.perf_counter()
+    try:
+        transcriber = create_transcriber(language, backend, cache, max_segment)
+        backend = transcriber.backend.name
+        transcription = transcriber.transcribe(audio)
+        if transcription:
+            print(transcription)
+        else:
+            print("Transcription failed or returned empty.")
+    except Exception as e:
+        print(f"Transcription error: {e}")
+    if cache:
+        # Keep stdout for the transcript itself
+        click.echo(f"Cache: {cache.stats()}", err=True)
+    register_session(language=language, backend=backend, latency=time.perf_counter() - started,
+                     text=transcription, **entry)
+    return bool(transcription)
+
+
+@click.group(invoke_without_command=True)
 @click.option('--output', '-o', type=click.Path(), help='Output MP3 file path')
 @click.option('--bitrate', '-b', default='16k', help='MP3 bitrate (default: 16k)')
 @click.option('--no-playback', is_flag=True, help='Skip automatic playback after recording')
@@ -19,9 +68,29 @@ from .transcriber import AudioTranscriber
 @click.option('--test-bitrates', is_flag=True, help='Test multiple bitrates (8k to 320k) to compare quality')
 @click.option('--transcribe', is_flag=True, help='Transcribe the audio using Deepinfra Voxtral API')
 @click.option('--language', '-l', default='fr', help='Language for transcription (default: fr)')
-def main(output, bitrate, no_playback, keep_wav, test_bitrates, transcribe, language):
+@click.option('--stream-encode', is_flag=True, help='Encode to MP3 while recording so the file is ready right after stop')
+@click.option('--trim-silence', is_flag=True, help='Trim leading/trailing silence and shorten long pauses before encoding')
+@click.option('--max-pause', default=0.5, type=float, help='Longest pause kept by --trim-silence, in seconds (default: 0.5)')
+@click.option('--no-save', is_flag=True, help='With --transcribe, encode and upload from memory without writing any file')
+@click.option('--no-cache', is_flag=True, help='Always call the API instead of reusing cached transcripts')
+@click.option('--backend', help='Transcription backend: deepinfra, openai or local (default: from config)')
+@click.option('--sample-rate', type=int, help='Sample rate of the recording (default: 16000 with --transcribe, else 44100)')
+@click.option('--device-rate', default=44100, type=int, help='Rate the microphone is opened at; resampled to --sample-rate (default: 44100)')
+@click.option('--max-segment', type=float, help='Split longer recordings at pauses and transcribe the pieces in parallel, in seconds (default: 120)')
+@click.option('--no-daemon', is_flag=True, help='Record in this process even if `parle serve` is running')
+@click.option('--journal', is_flag=True, help='Spill audio to disk as it is captured so long or interrupted sessions can be recovered with `parle recover`')
+@click.pass_context
+def main(ctx, output, bitrate, no_playback, keep_wav, test_bitrates, transcribe, language, stream_encode,
+         trim_silence, max_pause, no_save, no_cache, backend, sample_rate, device_rate, max_segment, no_daemon,
+         journal):
     """Record microphone input, save as MP3, and play it back."""
     
+    setup_metrics(Config())
+    if ctx.invoked_subcommand is not None:
+        return
+    
+    in_memory = transcribe and no_save and not test_bitrates and not keep_wav
+    
     if test_bitrates:
         timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
         base_name = f"test_{timestamp}"
@@ -33,7 +102,49 @@ def main(output, bitrate, no_playback, keep_wav, test_bitrates, transcribe, lang
         timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
         output_path = Path(f"recording_{timestamp}.mp3")
     
-    recorder = AudioRecorder()
+    if sample_rate is None:
+        # Speech models work at 16 kHz; keep full quality for plain recordings
+        sample_rate = 16000 if transcribe and not test_bitrates else 44100
+    
+    # Hand the recording to a warm daemon if one is running; it only writes MP3
+    other_format = not (test_bitrates or in_memory) and output_path.suffix.lower() != '.mp3'
+    client = None if no_daemon or test_bitrates or keep_wav or journal or other_format else DaemonClient.connect()
+    if client:
+        try:
+            ok = client.record({
+                'output': None if in_memory else str(output_path.resolve()),
+                'bitrate': bitrate,
+                'playback': not no_playback,
+                'transcribe': transcribe,
+                'language': language,
+                'trim_silence': trim_silence,
+                'max_pause': max_pause,
+                'cache': not no_cache,
+                'backend': backend,
+                'sample_rate': sample_rate,
+                'device_rate': device_rate,
+                'max_segment': max_segment,
+            })
+        finally:
+            client.close()
+        sys.exit(0 if ok else 1)
+    
+    from .recorder import AudioRecorder
+    from .converter import AudioConverter, StreamingEncoder
+    from .journal import sessions_dir
+    from .player import AudioPlayer
+    from .vad import SilenceCompactor
+    
+    recorder = AudioRecorder(
+        sample_rate=sample_rate,
+        device_rate=device_rate,
+        capture_mode='callback',
+        silence_compactor=SilenceCompactor(max_pause=max_pause) if trim_silence else None,
+        spill_dir=sessions_dir() if journal else None
+    )
+    encoder = None
+    # Set once the audio is safely in its output, so the journal can go
+    saved = False
     
     try:
         if transcribe:
@@ -44,17 +155,16 @@ def main(output, bitrate, no_playback, keep_wav, test_bitrates, transcribe, lang
         recording = True
         def record_audio():
             while recording:
-                recorder.record_chunk()
+                if not recorder.record_chunk():
+                    break
         
         if transcribe:
-            recorder.frames = []
-            recorder.stream = recorder.audio.open(
-                format=pyaudio.paInt16,
-                channels=recorder.channels,
-                rate=recorder.sample_rate,
-                input=True,
-                frames_per_buffer=recorder.chunk_size
-            )
+            recorder.open_stream()
+        
+        # Stream encoding sees the raw capture, so it can't be combined with trimming
+        if stream_encode and not test_bitrates and not trim_silence:
+            encoder = StreamingEncoder(None if in_memory else output_path, recorder.sample_rate, recorder.channels, bitrate).start()
+            recorder.add_sink(encoder)
         
         record_thread = threading.Thread(target=record_audio)
         record_thread.start()
@@ -64,21 +174,58 @@ def main(output, bitrate, no_playback, keep_wav, test_bitrates, transcribe, lang
         recording = False
         record_thread.join()
         
+        if recorder.error:
+            print(f"Recording error: {recorder.error}")
+        
+        if in_memory:
+            pcm = recorder.stop_recording_pcm()
+            if pcm is None:
+                print("No audio recorded.")
+                sys.exit(1)
+            duration = len(pcm) / (recorder.sample_rate * recorder.channels * 2)
+            if encoder:
+                mp3 = encoder.finish()
+                encoder = None
+            else:
+                mp3 = AudioConverter.pcm_to_mp3_bytes(pcm, recorder.sample_rate, recorder.channels, bitrate)
+            pcm.release()
+            # Nothing else holds the audio, so keep the journal if this fails
+            saved = print_transcription(mp3, language, not no_cache, backend, max_segment,
+                                        duration=duration, codec='mp3', bitrate=bitrate)
+            return
+        
         if not transcribe:
             print("Stopping recording...")
-        wav_path = recorder.stop_recording()
+        wav_path = None
+        if encoder and not keep_wav:
+            # The encoder already has every sample, so skip the temp WAV
+            pcm = recorder.stop_recording_pcm()
+            recorded = pcm is not None
+            if recorded:
+                pcm.release()
+        else:
+            wav_path = recorder.stop_recording()
+            recorded = wav_path is not None
+        duration = len(recorder.buffer) / (recorder.sample_rate * recorder.channels * 2) - recorder.removed_seconds
+        if recorder.removed_seconds and not transcribe:
+            print(f"Removed {recorder.removed_seconds:.1f}s of silence")
         
-        if wav_path:
+        if recorded:
             if test_bitrates:
                 test_bitrate_list = ['8k', '16k', '32k', '64k', '96k', '128k', '192k', '256k', '320k']
                 print(f"\nTesting {len(test_bitrate_list)} different bitrates...")
                 
+                outputs = {b: Path(f"{base_name}_{b}.mp3") for b in test_bitrate_list}
+                started = time.perf_counter()
+                results = AudioConverter.wav_to_mp3_multi(wav_path, outputs)
+                elapsed = time.perf_counter() - started
+                
                 mp3_files = []
-                for test_bitrate in test_bitrate_list:
-                    output_path = Path(f"{base_name}_{test_bitrate}.mp3")
-                    print(f"Converting to {test_bitrate}: {output_path}")
-                    mp3_path = AudioConverter.wav_to_mp3(wav_path, output_path, test_bitrate)
-                    mp3_files.append((test_bitrate, mp3_path))
+                for result in results:
+                    print(f"  {result['bitrate']:>5}  {result['size'] / 1024:8.1f} KB  "
+                          f"{result['encode_time']:.2f}s  {result['path']}")
+                    mp3_files.append((result['bitrate'], result['path']))
+                print(f"Encoded {len(results)} bitrates in {elapsed:.2f}s")
                 
                 if not no_playback:
                     print("\n=== Playing all bitrates for comparison ===")
@@ -89,33 +236,37 @@ def main(output, bitrate, no_playback, keep_wav, test_bitrates, transcribe, lang
                             input("Press Enter to continue to next bitrate...")
                 
                 print(f"\nAll test files saved with prefix: {base_name}_*.mp3")
+                saved = True
                 
                 if not keep_wav:
                     AudioConverter.cleanup_temp_file(wav_path)
             else:
-                if not transcribe:
-                    print(f"Converting to MP3: {output_path}")
-                mp3_path = AudioConverter.wav_to_mp3(wav_path, output_path, bitrate)
+                if encoder:
+                    mp3_path = encoder.finish()
+                    encoder = None
+                else:
+                    if not transcribe:
+                        print(f"Converting to MP3: {output_path}")
+                    mp3_path = AudioConverter.wav_to_mp3(wav_path, output_path, bitrate)
                 
-                if not keep_wav:
+                saved = True
+                if wav_path and not keep_wav:
                     AudioConverter.cleanup_temp_file(wav_path)
                     
                 if not transcribe:
                     print(f"Recording saved to: {mp3_path}")
                 
+                # ffmpeg picked the format from the suffix; bitrates only apply to lossy ones
+                codec = Path(mp3_path).suffix.lstrip('.').lower()
+                entry = {'path': str(Path(mp3_path).resolve()), 'duration': duration, 'codec': codec,
+                         'bitrate': None if codec in ('wav', 'flac') else bitrate}
                 if transcribe:
-                    try:
-                        transcriber = AudioTranscriber(language=language)
-                        transcription = transcriber.transcribe(mp3_path)
-                        if transcription:
-                            print(transcription)
-                        else:
-                            print("Transcription failed or returned empty.")
-                    except Exception as e:
-                        print(f"Transcription error: {e}")
-                elif not no_playback:
-                    print("\nPlaying back the recording...")
-                    AudioPlayer.play_mp3(mp3_path)
+                    print_transcription(mp3_path, language, not no_cache, backend, max_segment, **entry)
+                else:
+                    register_session(**entry)
+                    if not no_playback:
+                        print("\nPlaying back the recording...")
+                        AudioPlayer.play_mp3(mp3_path)
         else:
             print("No audio recorded.")
             sys.exit(1)
@@ -127,7 +278,243 @@ def main(output, bitrate, no_playback, keep_wav, test_bitrates, transcribe, lang
         print(f"Error: {e}")
         sys.exit(1)
     finally:
+        if encoder:
+            encoder.abort()
+        if recorder.journal and saved:
+            recorder.discard_journal()
+        elif recorder.journal and len(recorder.journal):
+            print(f"Audio kept in {recorder.journal.directory}; restore it with `parle recover`.")
         recorder.cleanup()
+        AudioPlayer.shutdown()
+
+
+@main.command()
+@click.argument('inputs', nargs=-1, required=True)
+@click.option('--output', '-o', type=click.Path(), default='transcripts.jsonl', help='JSONL results file, appended to (default: transcripts.jsonl)')
+@click.option('--workers', '-w', default=4, type=int, help='Concurrent transcriptions (default: 4)')
+@click.option('--rate', default=0.0, type=float, help='Max HTTP requests per second, segments and retries included, 0 for no limit (default: 0)')
+@click.option('--language', '-l', default='fr', help='Language for transcription (default: fr)')
+@click.option('--no-cache', is_flag=True, help='Always call the API instead of reusing cached transcripts')
+@click.option('--backend', help='Transcription backend: deepinfra, openai or local (default: from config)')
+def batch(inputs, output, workers, rate, language, no_cache, backend):
+    """Transcribe files, directories or glob patterns into a JSONL file.
+
+    Files that already have a result in the output file are skipped.
+    """
+    from .batch import BatchTranscriber, expand_inputs
+    from .cache import TranscriptionCache
+    
+    files = expand_inputs(inputs)
+    if not files:
+        print("No audio files found.")
+        sys.exit(1)
+    
+    try:
+        cache = None if no_cache else TranscriptionCache()
+        transcriber = create_transcriber(language, backend, cache)
+    except ValueError as e:
+        print(f"Error: {e}")
+        sys.exit(1)
+    
+    runner = BatchTranscriber(transcriber, Path(output), workers=workers, rate=rate)
+    stats = runner.run(files)
+    
+    throughput = stats['audio_seconds'] / stats['wall_seconds'] if stats['wall_seconds'] else 0.0
+    print(f"\n{stats['ok']} transcribed, {stats['failed']} failed, {stats['skipped']} already done")
+    print(f"{stats['audio_seconds']:.1f} audio-s in {stats['wall_seconds']:.1f}s "
+          f"({throughput:.2f} audio-s per wall-s)")
+    if cache:
+        print(f"Cache: {cache.stats()}")
+    if stats['failed']:
+        sys.exit(1)
+
+
+@main.command('fake-server')
+@click.option('--host', default='127.0.0.1', help='Interface to listen on (default: 127.0.0.1)')
+@click.option('--port', default=8765, type=int, help='Port to listen on (default: 8765)')
+@click.option('--latency', default=0.0, type=float, help='Fixed response delay in seconds')
+@click.option('--jitter', default=0.0, type=float, help='Extra random delay of up to this many seconds')
+@click.option('--error-rate', default=0.0, type=float, help='Fraction of requests answered with an error (0-1)')
+@click.option('--error-status', default=503, type=int, help='HTTP status used for simulated errors (default: 503)')
+@click.option('--throughput', type=float, help='Upload bandwidth cap in KB/s (default: unlimited)')
+def fake_server(host, port, latency, jitter, error_rate, error_status, throughput):
+    """Run a local stand-in transcription API for offline load testing.
+
+    Point parle at it with --backend local (or "backend": "local" in the config).
+    """
+    from .fake_server import FakeTranscriptionServer
+    
+    server = FakeTranscriptionServer(
+        host, port,
+        latency=latency,
+        jitter=jitter,
+        error_rate=error_rate,
+        error_status=error_status,
+        throughput=throughput * 1024 if throughput else None
+    )
+    print(f"Fake transcription server listening on {server.url}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print(f"\nServed {server.requests} requests ({server.errors} simulated errors)")
+
+
+@main.command()
+@click.option('--lengths', default='5,30,120', help='Comma-separated synthetic audio lengths in seconds (default: 5,30,120)')
+@click.option('--iterations', '-n', default=5, type=int, help='Runs per length (default: 5)')
+@click.option('--bitrate', '-b', default='16k', help='MP3 bitrate (default: 16k)')
+@click.option('--latency', default=0.0, type=float, help='Simulated API latency in seconds (default: 0)')
+@click.option('--sample-rate', default=44100, type=int, help='Recording sample rate (default: 44100)')
+@click.option('--device-rate', type=int, help='Simulated device rate, resampled to --sample-rate during capture')
+@click.option('--codec', default='mp3', type=click.Choice(['mp3', 'opus', 'flac', 'auto']), help='Format uploaded to the mock API; auto adapts to the link (default: mp3)')
+@click.option('--throughput', type=float, help='Upload bandwidth cap of the mock API in KB/s (default: unlimited)')
+@click.option('--output', '-o', type=click.Path(), help='Results file (default: ~/.parle/bench/bench_<timestamp>.json)')
+@click.option('--compare', type=click.Path(exists=True), help='Earlier results file to compare p50 against')
+def bench(lengths, iterations, bitrate, latency, sample_rate, device_rate, codec, throughput, output, compare):
+    """Benchmark each pipeline stage on synthetic audio against a local mock API."""
+    from .bench import PipelineBenchmark, format_report, save_results
+    
+    benchmark = PipelineBenchmark(
+        lengths=[float(length) for length in lengths.split(',')],
+        iterations=iterations,
+        bitrate=bitrate,
+        latency=latency,
+        sample_rate=sample_rate,
+        device_rate=device_rate,
+        codec=codec,
+        throughput=throughput * 1024 if throughput else None
+    )
+    report = benchmark.run()
+    baseline = None
+    if compare:
+        with open(compare) as f:
+            baseline = json.load(f)
+    print(format_report(report, baseline))
+    print(f"\nResults saved to: {save_results(report, Path(output) if output else None)}")
+
+
+
+@main.command()
+@click.option('--stop', is_flag=True, help='Stop the running daemon')
+@click.option('--status', is_flag=True, help='Report whether a daemon is running')
+def serve(stop, status):
+    """Run a background daemon that keeps audio, encoder and HTTP connections warm.
+
+    While it runs, `parle` hands recordings to it over a Unix domain socket
+    instead of starting everything up on each run.
+    """
+    if stop or status:
+        client = DaemonClient.connect()
+        if not client:
+            print("No parle daemon running.")
+            sys.exit(1)
+        try:
+            reply = client.request('shutdown' if stop else 'ping')
+        finally:
+            client.close()
+        print(reply['text'] if reply else "No reply from the parle daemon.")
+        return
+    
+    from .daemon import ParleDaemon
+    
+    daemon = ParleDaemon()
+    print(f"parle daemon listening on {daemon.path}")
+    try:
+        daemon.serve_forever()
+    except RuntimeError as e:
+        print(f"Error: {e}")
+        sys.exit(1)
+    except KeyboardInterrupt:
+        print(f"\nStopped after {daemon.sessions} recordings")
+
+
+@main.command()
+@click.argument('sessions', nargs=-1, type=click.Path(exists=True, file_okay=False))
+@click.option('--list', 'list_only', is_flag=True, help='Only list the recoverable sessions')
+@click.option('--output-dir', '-d', type=click.Path(file_okay=False), default='.', help='Where to write the WAV files (default: current directory)')
+@click.option('--keep', is_flag=True, help='Keep the session files after recovering them')
+def recover(sessions, list_only, output_dir, keep):
+    """Rebuild WAV files from recordings made with --journal that never finished.
+
+    Without arguments, every session left under ~/.parle/sessions is recovered.
+    """
+    from .journal import SpillBuffer, list_sessions, lock_session, read_journal, recover_session
+    
+    paths = [Path(session) for session in sessions] or list_sessions()
+    if not paths:
+        print("No interrupted recordings found.")
+        return
+    
+    output_dir = Path(output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+    failed = False
+    for path in paths:
+        # Locking creates a lock file, so only lock what really is a session
+        if not (path / SpillBuffer.JOURNAL).is_file():
+            print(f"{path}: not a recording session (no {SpillBuffer.JOURNAL})")
+            failed = True
+            continue
+        # Held until the session is deleted, so a live recording is never touched
+        lock = lock_session(path)
+        if lock is None:
+            print(f"{path.name}: still being recorded, skipped")
+            continue
+        try:
+            info = read_journal(path)
+            if info is None:
+                print(f"{path}: no usable journal")
+                failed = True
+                continue
+            started = datetime.fromtimestamp(info['started']).strftime("%Y-%m-%d %H:%M:%S")
+            print(f"{path.name}: {info['seconds']:.1f}s recorded at {info['sample_rate']} Hz, started {started}")
+            if list_only:
+                continue
+            if not info['length']:
+                print("  nothing to recover")
+            else:
+                wav_path = output_dir / f"recovered_{path.name}.wav"
+                try:
+                    recover_session(path, wav_path)
+                except (OSError, RuntimeError) as e:
+                    print(f"  Error: {e}")
+                    failed = True
+                    continue
+                print(f"  saved to {wav_path}")
+            if not keep:
+                if os.name == 'nt':
+                    # Windows can't delete a file that is still open
+                    lock.close()
+                shutil.rmtree(path, ignore_errors=True)
+        finally:
+            lock.close()
+    if failed:
+        sys.exit(1)
+
+
+@main.command()
+@click.argument('query', nargs=-1)
+@click.option('--limit', '-n', default=20, type=int, help='Maximum number of results (default: 20)')
+@click.option('--json', 'as_json', is_flag=True, help='Print the results as JSON lines')
+def search(query, limit, as_json):
+    """Search past transcripts; without a query, list the most recent recordings."""
+    from .catalog import Catalog
+    
+    catalog = Catalog()
+    started = time.perf_counter()
+    results = catalog.search(' '.join(query), limit)
+    elapsed = time.perf_counter() - started
+    
+    for result in results:
+        if as_json:
+            print(json.dumps(result, ensure_ascii=False))
+            continue
+        created = datetime.fromtimestamp(result['created']).strftime("%Y-%m-%d %H:%M")
+        duration = f"{result['duration']:.1f}s" if result['duration'] is not None else "?"
+        print(f"{created}  {duration:>7}  {result['language'] or '-':<3} {result['source']:<5} {result['path'] or ''}")
+        if result['snippet']:
+            print(f"    {result['snippet']}")
+    # Keep stdout for the results themselves
+    click.echo(f"{len(results)} results in {elapsed * 1000:.1f} ms", err=True)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,87 @@
+import json
+import os
+import socket
+from pathlib import Path
+from typing import Optional
+
+
+def socket_path() -> Path:
+    """Where ``parle serve`` listens: $PARLE_SOCKET or ~/.parle/parle.sock."""
+    return Path(os.getenv('PARLE_SOCKET') or Path.home() / '.parle' / 'parle.sock')
+
+
+class DaemonClient:
+    """Connection to a running ``parle serve`` daemon.
+
+    Messages are JSON objects, one per line, in both directions. This module
+    only uses the standard library so the CLI can hand a recording to the
+    daemon without importing numpy, scipy or requests itself.
+    """
+
+    def __init__(self, sock: socket.socket):
+        self.sock = sock
+        self._reader = sock.makefile('r', encoding='utf-8')
+
+    @classmethod
+    def connect(cls, path: Optional[Path] = None, timeout: float = 0.5) -> Optional['DaemonClient']:
+        """Connect to the daemon, or return None if none is listening."""
+        if not hasattr(socket, 'AF_UNIX'):
+            return None
+        path = path or socket_path()
+        if not path.exists():
+            return None
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        sock.settimeout(timeout)
+        try:
+            sock.connect(str(path))
+        except OSError:
+            sock.close()
+            return None
+        sock.settimeout(None)
+        return cls(sock)
+
+    def send(self, message: dict):
+        self.sock.sendall((json.dumps(message) + '\n').encode('utf-8'))
+
+    def receive(self) -> Optional[dict]:
+        """Next event from the daemon, or None once the connection is closed."""
+        line = self._reader.readline()
+        return json.loads(line) if line else None
+
+    def request(self, cmd: str) -> Optional[dict]:
+        self.send({'cmd': cmd})
+        return self.receive()
+
+    def record(self, options: dict) -> bool:
+        """Run one recording session, printing the daemon's output. Returns False on error."""
+        self.send(dict(options, cmd='record'))
+        event = self.receive()
+        if event is None or event['event'] == 'error':
+            print(event['text'] if event else "Lost connection to the parle daemon.")
+            return False
+        print(event['text'])
+
+        try:
+            input()
+        except KeyboardInterrupt:
+            self.send({'cmd': 'cancel'})
+            print("\nRecording cancelled.")
+            return True
+        self.send({'cmd': 'stop'})
+
+        ok = True
+        while True:
+            event = self.receive()
+            if event is None:
+                print("Lost connection to the parle daemon.")
+                return False
+            if event['event'] == 'done':
+                return ok
+            if event['event'] == 'error':
+                ok = False
+            if event.get('text'):
+                print(event['text'])
+
+    def close(self):
+        self._reader.close()
+        self.sock.close()
@@ -13,7 +13,31 @@ class Config:
             'start_on_boot': False,
             'show_notifications': True,
             'beep_on_start': True,
-            'beep_on_stop': True
+            'beep_on_stop': True,
+            'stream_encode': False,
+            'capture_mode': 'callback',
+            'sample_rate': 16000,
+            'device_rate': 44100,
+            'always_armed': False,
+            'preroll': 0.5,
+            'streaming_transcription': True,
+            'segment_pause': 0.6,
+            'incremental_paste': False,
+            'trim_silence': True,
+            'max_pause': 0.5,
+            'keepalive_interval': 45,
+            'keep_recordings': False,
+            'codec': 'opus',
+            'bitrate': 'auto',
+            'min_bitrate': '12k',
+            'backend': 'deepinfra',
+            'api_url': None,
+            'max_segment': 120,
+            'transcribe_workers': 4,
+            'pipeline_workers': 2,
+            'catalog': True,
+            'catalog_dictation': False,
+            'metrics': False
         }
         self.config = self.load()
     
@@ -2,9 +2,58 @@ import soundfile as sf
 import numpy as np
 from scipy.io import wavfile
 from pathlib import Path
-from typing import Optional
+from typing import Dict, Iterator, List, Optional, Union
+from abc import ABC, abstractmethod
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+import importlib.util
+import io
+import os
+import shutil
 import subprocess
-import sys
+import threading
+import time
+import wave
+
+from .buffer import PCMBuffer
+from .metrics import metrics
+
+CODECS = {}
+
+
+def register_codec(name: str):
+    """Class decorator adding a codec to the registry under ``name``.
+
+    The codec is instantiated here, so one missing ``encode`` fails at import.
+    """
+    def decorator(cls):
+        cls.name = name
+        CODECS[name] = cls()
+        return cls
+    return decorator
+
+
+@lru_cache(maxsize=None)
+def ffmpeg_available() -> bool:
+    return shutil.which("ffmpeg") is not None
+
+
+@lru_cache(maxsize=None)
+def opus_available() -> bool:
+    return 'OPUS' in sf.available_subtypes('OGG')
+
+
+@lru_cache(maxsize=None)
+def ffmpeg_python_available() -> bool:
+    return importlib.util.find_spec("ffmpeg") is not None
+
+
+def parse_bitrate(bitrate: str) -> int:
+    """'16k' -> 16000 bits per second."""
+    bitrate = bitrate.strip().lower()
+    if bitrate.endswith('k'):
+        return int(float(bitrate[:-1]) * 1000)
+    return int(bitrate)
 
 
 class AudioConverter:
@@ -16,32 +65,236 @@ class AudioConverter:
         if output_path is None:
             output_path = wav_path.with_suffix(".mp3")
         
-        try:
-            result = subprocess.run([
-                sys.executable, "-m", "pip", "show", "ffmpeg-python"
-            ], capture_output=True, text=True)
+        with metrics.span('convert.wav_to_mp3', bitrate=bitrate):
+            try:
+                if ffmpeg_python_available():
+                    import ffmpeg
+                    ffmpeg.input(str(wav_path)).output(
+                        str(output_path), 
+                        audio_bitrate=bitrate
+                    ).overwrite_output().run(quiet=True)
+                else:
+                    result = subprocess.run([
+                        "ffmpeg", "-i", str(wav_path), 
+                        "-b:a", bitrate, 
+                        "-y", str(output_path)
+                    ], capture_output=True, text=True)
+                
+                    if result.returncode != 0:
+                        raise RuntimeError(f"FFmpeg conversion failed. Please install FFmpeg: {result.stderr}")
+            except FileNotFoundError:
+                raise RuntimeError("FFmpeg not found. Please install FFmpeg and ensure it's in your PATH")
+            except Exception as e:
+                raise RuntimeError(f"Audio conversion failed: {e}")
             
-            if result.returncode == 0:
-                import ffmpeg
-                ffmpeg.input(str(wav_path)).output(
-                    str(output_path), 
-                    audio_bitrate=bitrate
-                ).overwrite_output().run(quiet=True)
-            else:
+        if metrics.enabled:
+            metrics.count('encoded_bytes', output_path.stat().st_size)
+        return output_path
+        
+    @staticmethod
+    def pcm_to_mp3_bytes(pcm, sample_rate: int = 44100, channels: int = 1, bitrate: str = "16k") -> bytes:
+        """Encode raw 16-bit PCM to MP3 entirely through pipes, without temp files."""
+        with metrics.span('convert.pcm_to_mp3', bitrate=bitrate, pcm_bytes=len(pcm)):
+            try:
                 result = subprocess.run([
-                    "ffmpeg", "-i", str(wav_path), 
-                    "-b:a", bitrate, 
-                    "-y", str(output_path)
-                ], capture_output=True, text=True)
-                
-                if result.returncode != 0:
-                    raise RuntimeError(f"FFmpeg conversion failed. Please install FFmpeg: {result.stderr}")
+                    "ffmpeg", "-hide_banner", "-loglevel", "error",
+                    "-f", "s16le", "-ar", str(sample_rate), "-ac", str(channels),
+                    "-i", "pipe:0",
+                    "-b:a", bitrate,
+                    "-f", "mp3", "pipe:1"
+                ], input=pcm, capture_output=True)
+            except FileNotFoundError:
+                raise RuntimeError("FFmpeg not found. Please install FFmpeg and ensure it's in your PATH")
+            
+            if result.returncode != 0:
+                raise RuntimeError(f"FFmpeg conversion failed: {result.stderr.decode(errors='replace')}")
+        metrics.count('encoded_bytes', len(result.stdout))
+        return result.stdout
+        
+    @staticmethod
+    def codec(name: str, fallback: bool = True) -> 'Codec':
+        """Look up a registered codec.
+
+        If it can't be used here (no ffmpeg, or a libsndfile without Opus),
+        the first available one is returned instead unless ``fallback`` is False.
+        """
+        try:
+            codec = CODECS[name]
+        except KeyError:
+            raise ValueError(f"Unknown codec: {name} (available: {', '.join(sorted(CODECS))})")
+        if codec.available():
+            return codec
+        if fallback:
+            for other in CODECS.values():
+                if other.available():
+                    return other
+        raise RuntimeError(f"The {name} codec is not available")
+        
+    @staticmethod
+    def encode_pcm(pcm, sample_rate: int = 16000, channels: int = 1, codec: str = "mp3",
+                   bitrate: str = "16k") -> bytes:
+        """Encode raw 16-bit PCM with a registered codec, returning the file bytes."""
+        return AudioConverter.codec(codec).encode(pcm, sample_rate, channels, bitrate)
+        
+    @staticmethod
+    def wav_to_mp3_multi(wav_path: Path, outputs: Dict[str, Path], max_workers: Optional[int] = None) -> List[dict]:
+        """Encode one WAV into several bitrates, decoding it only once.
+
+        ``outputs`` maps a bitrate (e.g. ``"16k"``) to its output path. The PCM
+        is read a single time and piped into a bounded pool of ffmpeg encoders.
+        Returns one ``{'bitrate', 'path', 'size', 'encode_time'}`` dict per
+        output, in the order given.
+        """
+        if not wav_path.exists():
+            raise FileNotFoundError(f"WAV file not found: {wav_path}")
+        
+        with wave.open(str(wav_path), 'rb') as wf:
+            sample_rate = wf.getframerate()
+            channels = wf.getnchannels()
+            pcm = wf.readframes(wf.getnframes())
+        
+        def encode(bitrate, output_path):
+            started = time.perf_counter()
+            encoder = StreamingEncoder(output_path, sample_rate, channels, bitrate).start()
+            encoder.write(pcm)
+            encoder.finish()
+            return {
+                'bitrate': bitrate,
+                'path': output_path,
+                'size': output_path.stat().st_size,
+                'encode_time': time.perf_counter() - started
+            }
+        
+        if max_workers is None:
+            max_workers = min(len(outputs), os.cpu_count() or 1) or 1
+        with ThreadPoolExecutor(max_workers=max_workers) as pool:
+            futures = [pool.submit(encode, bitrate, path) for bitrate, path in outputs.items()]
+            return [future.result() for future in futures]
+        
+    @staticmethod
+    def open_pcm_decoder(audio: Union[Path, bytes], sample_rate: int = 16000, channels: int = 1,
+                         start: float = 0.0) -> subprocess.Popen:
+        """Start an ffmpeg process decoding ``audio`` to 16-bit PCM on its stdout.
+
+        For bytes input the caller must write them to the process's stdin.
+        """
+        from_memory = not isinstance(audio, (str, Path))
+        seek = ["-ss", f"{start:.3f}"] if start else []
+        try:
+            return subprocess.Popen([
+                "ffmpeg", "-hide_banner", "-loglevel", "error"
+            ] + seek + [
+                "-i", "pipe:0" if from_memory else str(audio),
+                "-f", "s16le", "-ac", str(channels), "-ar", str(sample_rate),
+                "pipe:1"
+            ], stdin=subprocess.PIPE if from_memory else subprocess.DEVNULL,
+                stdout=subprocess.PIPE, stderr=subprocess.DEVNULL)
         except FileNotFoundError:
             raise RuntimeError("FFmpeg not found. Please install FFmpeg and ensure it's in your PATH")
-        except Exception as e:
-            raise RuntimeError(f"Audio conversion failed: {e}")
-            
-        return output_path
+        
+    @staticmethod
+    def iter_pcm(audio: Union[Path, bytes], sample_rate: int = 16000, channels: int = 1,
+                 chunk_size: int = 65536) -> Iterator[bytes]:
+        """Decode a file path or encoded bytes to 16-bit PCM with ffmpeg, yielding chunks."""
+        from_memory = not isinstance(audio, (str, Path))
+        process = AudioConverter.open_pcm_decoder(audio, sample_rate, channels)
+        
+        if from_memory:
+            def feed(stdin):
+                try:
+                    stdin.write(audio)
+                except (BrokenPipeError, OSError):
+                    pass
+                finally:
+                    stdin.close()
+            threading.Thread(target=feed, args=(process.stdin,), daemon=True).start()
+        
+        try:
+            while True:
+                chunk = process.stdout.read(chunk_size)
+                if not chunk:
+                    break
+                yield chunk
+        finally:
+            process.stdout.close()
+            returncode = process.wait()
+        if returncode != 0:
+            raise RuntimeError("Could not decode audio")
+        
+    @staticmethod
+    def iter_decoded(audio: Union[Path, bytes], sample_rate: int = 16000,
+                     blocksize: int = 65536) -> Iterator[bytes]:
+        """Decode to mono 16-bit PCM at ``sample_rate``, yielding chunks.
+
+        Uses libsndfile in-process for the containers it reads (WAV, FLAC,
+        Ogg/Opus and, with libsndfile 1.1+, MP3), and ffmpeg for anything
+        else. Audio is mixed down and resampled block by block, so memory use
+        stays flat even for hour-long files.
+        """
+        try:
+            source = sf.SoundFile(str(audio) if isinstance(audio, (str, Path)) else io.BytesIO(audio))
+        except Exception:
+            yield from AudioConverter.iter_pcm(audio, sample_rate, 1)
+            return
+        with source:
+            resampler = None
+            if source.samplerate != sample_rate:
+                from .resample import StreamingResampler
+                resampler = StreamingResampler(source.samplerate, sample_rate)
+            for block in source.blocks(blocksize=blocksize, dtype='int16', always_2d=True):
+                if source.channels > 1:
+                    # The mean of int16 samples can't leave the int16 range
+                    mixed = block.mean(axis=1, dtype=np.float32)
+                    pcm = np.rint(mixed, out=mixed).astype(np.int16).tobytes()
+                else:
+                    pcm = block.tobytes()
+                yield resampler.process(pcm) if resampler else pcm
+            if resampler:
+                yield resampler.flush()
+
+    @staticmethod
+    def decode(audio: Union[Path, bytes], sample_rate: int = 16000) -> np.ndarray:
+        """Decode to mono 16-bit samples at ``sample_rate`` (see ``iter_decoded``).
+
+        Audio that is already mono at ``sample_rate`` is read straight into
+        the result; anything else is collected into a buffer sized up front.
+        """
+        frames = 0
+        try:
+            with sf.SoundFile(str(audio) if isinstance(audio, (str, Path)) else io.BytesIO(audio)) as source:
+                if source.channels == 1 and source.samplerate == sample_rate:
+                    return source.read(dtype='int16')
+                if source.seekable():
+                    frames = source.frames * sample_rate // source.samplerate
+        except Exception:
+            pass
+        buffer = PCMBuffer(frames * 2 + 4096)
+        for chunk in AudioConverter.iter_decoded(audio, sample_rate):
+            buffer.append(chunk)
+        return buffer.as_array()
+        
+    @staticmethod
+    def duration(audio: Union[Path, bytes]) -> Optional[float]:
+        """Length of an audio file or encoded bytes in seconds, or None if it can't be probed."""
+        try:
+            if isinstance(audio, (str, Path)):
+                return sf.info(str(audio)).duration
+            return sf.info(io.BytesIO(audio)).duration
+        except Exception:
+            pass
+        if not isinstance(audio, (str, Path)):
+            return None
+        audio_path = audio
+        try:
+            result = subprocess.run([
+                "ffprobe", "-v", "error",
+                "-show_entries", "format=duration",
+                "-of", "default=noprint_wrappers=1:nokey=1",
+                str(audio_path)
+            ], capture_output=True, text=True)
+            return float(result.stdout.strip())
+        except (FileNotFoundError, ValueError):
+            return None
         
     @staticmethod
     def cleanup_temp_file(file_path: Path):
@@ -49,4 +302,170 @@ class AudioConverter:
             try:
                 file_path.unlink()
             except Exception:
-                pass
\ No newline at end of file
+                pass
+
+
+class StreamingEncoder:
+    """Encode raw PCM chunks into MP3 while they are still being captured.
+
+    A single ffmpeg process is started up front and fed over its stdin pipe,
+    so once capture stops only the last few frames remain to be flushed.
+    With ``output_path=None`` the MP3 is collected in memory and ``finish()``
+    returns its bytes instead of a path.
+    """
+
+    def __init__(self, output_path: Optional[Path], sample_rate: int = 44100, channels: int = 1, bitrate: str = "16k"):
+        self.output_path = output_path
+        self.sample_rate = sample_rate
+        self.channels = channels
+        self.bitrate = bitrate
+        self.process = None
+        self.failed = False
+        self._output = None
+        self._reader = None
+
+    def start(self):
+        if self.output_path is None:
+            target = ["-f", "mp3", "pipe:1"]
+        else:
+            target = ["-y", str(self.output_path)]
+        try:
+            self.process = subprocess.Popen([
+                "ffmpeg", "-hide_banner", "-loglevel", "error",
+                "-f", "s16le", "-ar", str(self.sample_rate), "-ac", str(self.channels),
+                "-i", "pipe:0",
+                "-b:a", self.bitrate
+            ] + target,
+                stdin=subprocess.PIPE,
+                stdout=subprocess.PIPE if self.output_path is None else subprocess.DEVNULL,
+                stderr=subprocess.PIPE
+            )
+        except FileNotFoundError:
+            raise RuntimeError("FFmpeg not found. Please install FFmpeg and ensure it's in your PATH")
+        
+        if self.output_path is None:
+            # Drain stdout concurrently so ffmpeg never blocks on a full pipe
+            self._output = io.BytesIO()
+            self._reader = threading.Thread(
+                target=lambda out: self._output.write(out.read()),
+                args=(self.process.stdout,),
+                daemon=True
+            )
+            self._reader.start()
+        return self
+
+    def write(self, data: bytes):
+        if self.process is None or self.failed:
+            return
+        try:
+            self.process.stdin.write(data)
+        except (BrokenPipeError, OSError):
+            # ffmpeg went away; finish() reports the error
+            self.failed = True
+
+    def finish(self) -> Union[Path, bytes]:
+        if self.process is None:
+            raise RuntimeError("Streaming encoder was never started")
+        try:
+            self.process.stdin.close()
+        except (BrokenPipeError, OSError):
+            self.failed = True
+        stderr = self.process.stderr.read().decode(errors="replace")
+        returncode = self.process.wait()
+        self.process = None
+        if self._reader:
+            self._reader.join()
+            self._reader = None
+        if self.failed or returncode != 0:
+            raise RuntimeError(f"Streaming MP3 encoding failed: {stderr}")
+        if self.output_path is None:
+            mp3 = self._output.getvalue()
+            metrics.count('encoded_bytes', len(mp3))
+            return mp3
+        if metrics.enabled:
+            metrics.count('encoded_bytes', self.output_path.stat().st_size)
+        return self.output_path
+
+    def abort(self):
+        if self.process is not None:
+            self.process.kill()
+            self.process.wait()
+            self.process = None
+        if self.output_path is not None:
+            AudioConverter.cleanup_temp_file(self.output_path)
+
+
+class Codec(ABC):
+    """A format recordings can be encoded to in memory before upload.
+
+    ``suffix`` names uploads, which is how backends pick the MIME type.
+    """
+
+    name = None
+    suffix = None
+
+    def available(self) -> bool:
+        return True
+
+    @abstractmethod
+    def encode(self, pcm, sample_rate: int, channels: int, bitrate: str) -> bytes:
+        """Encode 16-bit PCM, returning the file bytes."""
+
+    @staticmethod
+    def _write(pcm, sample_rate: int, channels: int, **options) -> bytes:
+        samples = np.frombuffer(pcm, dtype=np.int16).reshape(-1, channels)
+        output = io.BytesIO()
+        sf.write(output, samples, sample_rate, **options)
+        data = output.getvalue()
+        metrics.count('encoded_bytes', len(data))
+        return data
+
+
+@register_codec('opus')
+class OpusCodec(Codec):
+    """Ogg/Opus through libsndfile: built for speech, encoded in-process."""
+
+    suffix = '.ogg'
+    SAMPLE_RATES = (8000, 12000, 16000, 24000, 48000)
+
+    def available(self) -> bool:
+        return opus_available()
+
+    def encode(self, pcm, sample_rate: int, channels: int, bitrate: str) -> bytes:
+        with metrics.span('convert.encode', codec=self.name, pcm_bytes=len(pcm)):
+            if sample_rate not in self.SAMPLE_RATES:
+                # Opus only takes a few rates; step down to the nearest one
+                from .resample import StreamingResampler
+                target = max((rate for rate in self.SAMPLE_RATES if rate < sample_rate), default=8000)
+                resampler = StreamingResampler(sample_rate, target, channels)
+                pcm = resampler.process(bytes(pcm)) + resampler.flush()
+                sample_rate = target
+            # libsndfile sets the Opus bitrate from the compression level,
+            # from about 256 kbps at 0.0 down to 6 kbps at 1.0
+            level = 1.0 - (parse_bitrate(bitrate) - 6000) / 250000
+            return self._write(pcm, sample_rate, channels, format='OGG', subtype='OPUS',
+                               compression_level=min(max(level, 0.0), 1.0))
+
+
+@register_codec('mp3')
+class MP3Codec(Codec):
+    """MP3 through an ffmpeg process."""
+
+    suffix = '.mp3'
+
+    def available(self) -> bool:
+        return ffmpeg_available()
+
+    def encode(self, pcm, sample_rate: int, channels: int, bitrate: str) -> bytes:
+        return AudioConverter.pcm_to_mp3_bytes(pcm, sample_rate, channels, bitrate)
+
+
+@register_codec('flac')
+class FLACCodec(Codec):
+    """Lossless FLAC through libsndfile; the bitrate is ignored."""
+
+    suffix = '.flac'
+
+    def encode(self, pcm, sample_rate: int, channels: int, bitrate: str) -> bytes:
+        with metrics.span('convert.encode', codec=self.name, pcm_bytes=len(pcm)):
+            return self._write(pcm, sample_rate, channels, format='FLAC', subtype='PCM_16')
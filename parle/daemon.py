@@ -0,0 +1,244 @@
+import json
+import os
+import socketserver
+import threading
+import time
+from pathlib import Path
+from typing import Optional
+
+import pyaudio
+
+from .cache import TranscriptionCache
+from .catalog import Catalog
+from .client import DaemonClient, socket_path
+from .config import Config
+from .converter import AudioConverter, StreamingEncoder
+from .player import AudioPlayer
+from .recorder import AudioRecorder
+from .transcriber import AudioTranscriber
+from .vad import SilenceCompactor
+
+
+class ParleDaemon:
+    """Background process that keeps parle warm for thin ``parle`` clients.
+
+    Holds one PyAudio instance (device enumeration happens once), a pooled
+    and kept-alive HTTP session per backend, the transcript cache and a
+    pre-started ffmpeg encoder for the next recording. Clients connect to a
+    Unix domain socket and exchange JSON lines (see parle.client); one
+    recording runs at a time.
+    """
+
+    def __init__(self, path: Optional[Path] = None, config: Optional[Config] = None):
+        self.path = path or socket_path()
+        self.config = config or Config()
+        self.audio = pyaudio.PyAudio()
+        self.cache = TranscriptionCache()
+        self.catalog = Catalog() if self.config.get('catalog', True) else None
+        self.sessions = 0
+        self.server = None
+        self._transcribers = {}
+        self._spare = None
+        self._busy = threading.Lock()
+
+    def transcriber(self, backend: Optional[str], language: str) -> AudioTranscriber:
+        backend = backend or self.config.get('backend', 'deepinfra')
+        if backend not in self._transcribers:
+            transcriber = AudioTranscriber(
+                language=language,
+                cache=self.cache,
+                backend=backend,
+                api_url=self.config.get('api_url'),
+                max_segment=self.config.get('max_segment', 120),
+                max_workers=self.config.get('transcribe_workers', 4)
+            )
+            transcriber.start_keepalive(self.config.get('keepalive_interval', 45))
+            self._transcribers[backend] = transcriber
+        transcriber = self._transcribers[backend]
+        transcriber.language = language
+        return transcriber
+
+    def _prepare_encoder(self, sample_rate: int, channels: int, bitrate: str):
+        """Start ffmpeg ahead of the next recording so it is ready when capture begins."""
+        try:
+            self._spare = ((sample_rate, channels, bitrate),
+                           StreamingEncoder(None, sample_rate, channels, bitrate).start())
+        except RuntimeError as e:
+            print(f"Encoder not pre-started: {e}")
+            self._spare = None
+
+    def _take_encoder(self, sample_rate: int, channels: int, bitrate: str) -> Optional[StreamingEncoder]:
+        if self._spare is None:
+            return None
+        key, encoder = self._spare
+        if key != (sample_rate, channels, bitrate):
+            return None
+        self._spare = None
+        return encoder
+
+    def handle(self, connection):
+        reader = connection.makefile('r', encoding='utf-8')
+
+        def send(event: str, text: str = ''):
+            try:
+                connection.sendall((json.dumps({'event': event, 'text': text}) + '\n').encode('utf-8'))
+            except OSError:
+                pass
+
+        line = reader.readline()
+        if not line:
+            return
+        request = json.loads(line)
+        cmd = request.get('cmd')
+        if cmd == 'ping':
+            send('done', f"parle daemon on {self.path}, {self.sessions} recordings served")
+        elif cmd == 'shutdown':
+            send('done', "parle daemon stopping")
+            threading.Thread(target=self.server.shutdown, daemon=True).start()
+        elif cmd == 'record':
+            if not self._busy.acquire(blocking=False):
+                send('error', "The parle daemon is busy with another recording.")
+                return
+            try:
+                self._record(request, reader, send)
+            finally:
+                self._busy.release()
+        else:
+            send('error', f"Unknown command: {cmd}")
+
+    def _record(self, request: dict, reader, send):
+        transcribe = request.get('transcribe', False)
+        bitrate = request.get('bitrate', '16k')
+        output = Path(request['output']) if request.get('output') else None
+        compactor = SilenceCompactor(max_pause=request.get('max_pause', 0.5)) if request.get('trim_silence') else None
+        recorder = AudioRecorder(
+            sample_rate=request.get('sample_rate') or (16000 if transcribe else 44100),
+            device_rate=request.get('device_rate', 44100),
+            capture_mode='callback',
+            silence_compactor=compactor,
+            audio=self.audio
+        )
+        key = (recorder.sample_rate, recorder.channels, bitrate)
+        encoder = None
+        try:
+            if output and output.suffix.lower() != '.mp3':
+                send('error', f"The daemon only writes MP3 files, not {output.name}")
+                return
+            recorder.open_stream()
+            # Stream encoding sees the raw capture, so it can't be combined with trimming
+            if not compactor:
+                encoder = self._take_encoder(*key)
+                if encoder:
+                    recorder.add_sink(encoder)
+            stop = threading.Event()
+
+            def record_audio():
+                while not stop.is_set():
+                    if not recorder.record_chunk():
+                        break
+
+            record_thread = threading.Thread(target=record_audio)
+            record_thread.start()
+            send('recording', "Recording... Press Enter to stop.")
+
+            # A closed connection counts as a cancel
+            line = reader.readline()
+            stopped = bool(line) and json.loads(line).get('cmd') == 'stop'
+            stop.set()
+            record_thread.join()
+            pcm = recorder.stop_recording_pcm()
+            if not stopped:
+                if pcm is not None:
+                    pcm.release()
+                return
+
+            self.sessions += 1
+            if recorder.error:
+                send('message', f"Recording error: {recorder.error}")
+            if pcm is None:
+                send('error', "No audio recorded.")
+                return
+            duration = len(pcm) / (recorder.sample_rate * recorder.channels * 2)
+            if encoder:
+                mp3 = encoder.finish()
+                encoder = None
+            else:
+                mp3 = AudioConverter.pcm_to_mp3_bytes(pcm, recorder.sample_rate, recorder.channels, bitrate)
+            pcm.release()
+            entry = {'source': 'cli', 'path': str(output) if output else None, 'duration': duration,
+                     'codec': 'mp3', 'bitrate': bitrate}
+
+            if output:
+                output.write_bytes(mp3)
+                if not transcribe:
+                    send('message', f"Recording saved to: {output}")
+
+            if transcribe:
+                transcriber = self.transcriber(request.get('backend'), request.get('language', 'fr'))
+                transcriber.cache = self.cache if request.get('cache', True) else None
+                transcriber.max_segment = request.get('max_segment') or self.config.get('max_segment', 120)
+                started = time.perf_counter()
+                text = transcriber.transcribe(mp3, output.name if output else 'recording.mp3')
+                entry.update(language=transcriber.language, backend=transcriber.backend.name,
+                             latency=time.perf_counter() - started, text=text)
+                if text:
+                    send('transcript', text)
+                else:
+                    send('error', "Transcription failed or returned empty.")
+
+            if self.catalog:
+                self.catalog.add(**entry)
+            if not transcribe and output and request.get('playback', True):
+                send('message', "\nPlaying back the recording...")
+                AudioPlayer.play_mp3(output)
+        except Exception as e:
+            send('error', f"Error: {e}")
+        finally:
+            if encoder:
+                encoder.abort()
+            recorder.cleanup()
+            if self._spare is None:
+                self._prepare_encoder(*key)
+            send('done')
+
+    def serve_forever(self):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        if self.path.exists():
+            client = DaemonClient.connect(self.path)
+            if client:
+                client.close()
+                raise RuntimeError(f"A parle daemon is already listening on {self.path}")
+            # Left over from a daemon that didn't shut down cleanly
+            self.path.unlink()
+
+        daemon = self
+
+        class Handler(socketserver.BaseRequestHandler):
+            def handle(self):
+                daemon.handle(self.request)
+
+        self.server = socketserver.ThreadingUnixStreamServer(str(self.path), Handler)
+        self.server.daemon_threads = True
+        os.chmod(self.path, 0o600)
+        self._prepare_encoder(16000, 1, '16k')
+        try:
+            self.server.serve_forever()
+        finally:
+            self.close()
+
+    def close(self):
+        if self.server:
+            self.server.server_close()
+            self.server = None
+        if self.path.exists():
+            self.path.unlink()
+        if self._spare:
+            self._spare[1].abort()
+            self._spare = None
+        if self.catalog:
+            self.catalog.flush()
+        for transcriber in self._transcribers.values():
+            transcriber.close()
+        self._transcribers = {}
+        AudioPlayer.shutdown()
+        self.audio.terminate()
@@ -0,0 +1,124 @@
+import random
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Optional
+
+
+class FakeTranscriptionServer:
+    """Local stand-in for an OpenAI-style transcription API.
+
+    Accepts multipart POSTs on ``/v1/audio/transcriptions`` (and the Deepinfra
+    ``/v1/openai/...`` path) and answers with a canned transcript. Latency,
+    error rate and upload throughput are configurable so the client pipeline
+    can be benchmarked and load tested offline.
+    """
+
+    def __init__(self, host: str = '127.0.0.1', port: int = 8765, latency: float = 0.0,
+                 jitter: float = 0.0, error_rate: float = 0.0, error_status: int = 503,
+                 retry_after: Optional[float] = None, throughput: Optional[float] = None,
+                 per_audio_kb: float = 0.0, text: str = "This is a fake transcript."):
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self.retry_after = retry_after
+        # Upload bandwidth cap in bytes per second (None for unlimited)
+        self.throughput = throughput
+        # Extra "inference" delay per KB of uploaded audio
+        self.per_audio_kb = per_audio_kb
+        self.text = text
+        self.requests = 0
+        self.errors = 0
+        self._lock = threading.Lock()
+        self._thread = None
+        self.httpd = ThreadingHTTPServer((host, port), self._handler())
+        self.httpd.daemon_threads = True
+
+    @property
+    def url(self) -> str:
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}/v1/audio/transcriptions"
+
+    def _handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def log_message(self, format, *args):
+                pass
+
+            def _reply(self, status: int, body: bytes = b'', headers: Optional[dict] = None):
+                self.send_response(status)
+                self.send_header('Content-Type', 'text/plain; charset=utf-8')
+                self.send_header('Content-Length', str(len(body)))
+                for name, value in (headers or {}).items():
+                    self.send_header(name, value)
+                self.end_headers()
+                if self.command != 'HEAD':
+                    self.wfile.write(body)
+
+            def do_HEAD(self):
+                self._reply(200)
+
+            def do_POST(self):
+                if not self.path.rstrip('/').endswith('/audio/transcriptions'):
+                    self._reply(404, b'not found')
+                    return
+                body = server._read_body(self.rfile, int(self.headers.get('Content-Length', 0)))
+                status, text, headers = server._respond(body)
+                self._reply(status, text.encode('utf-8'), headers)
+
+        return Handler
+
+    def _read_body(self, stream, length: int) -> bytes:
+        chunks = []
+        started = time.perf_counter()
+        received = 0
+        while received < length:
+            chunk = stream.read(min(65536, length - received))
+            if not chunk:
+                break
+            chunks.append(chunk)
+            received += len(chunk)
+            if self.throughput:
+                # Sleep until the bytes received so far fit the bandwidth cap
+                ahead = received / self.throughput - (time.perf_counter() - started)
+                if ahead > 0:
+                    time.sleep(ahead)
+        return b''.join(chunks)
+
+    def _respond(self, body: bytes):
+        with self._lock:
+            self.requests += 1
+            failed = random.random() < self.error_rate
+            if failed:
+                self.errors += 1
+
+        delay = self.latency + random.uniform(0, self.jitter) + self.per_audio_kb * len(body) / 1024
+        if delay:
+            time.sleep(delay)
+        if failed:
+            headers = {'Retry-After': str(self.retry_after)} if self.retry_after is not None else {}
+            return self.error_status, 'simulated error', headers
+
+        match = re.search(rb'filename="([^"]*)"', body)
+        filename = match.group(1).decode('utf-8', 'replace') if match else 'audio'
+        return 200, f"{self.text} ({filename}, {len(body)} bytes)", {}
+
+    def start(self):
+        self._thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def serve_forever(self):
+        self.httpd.serve_forever()
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+        if self._thread:
+            self._thread.join()
+            self._thread = None
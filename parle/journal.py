@@ -0,0 +1,265 @@
+import json
+import mmap
+import os
+import shutil
+import time
+import wave
+from datetime import datetime
+from pathlib import Path
+from typing import List, Optional
+
+import numpy as np
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+    import msvcrt
+
+
+def sessions_dir() -> Path:
+    return Path.home() / '.parle' / 'sessions'
+
+
+def lock_session(directory: Path):
+    """Lock a session directory for exclusive use.
+
+    Returns the open lock file (close it to release the lock), or None if a
+    recording is still writing to the session. The operating system drops
+    the lock when the recording process dies, however it dies.
+    """
+    try:
+        handle = open(Path(directory) / SpillBuffer.LOCK, 'a+b')
+    except OSError:
+        return None
+    try:
+        if fcntl:
+            fcntl.flock(handle.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        else:
+            handle.seek(0)
+            msvcrt.locking(handle.fileno(), msvcrt.LK_NBLCK, 1)
+    except OSError:
+        handle.close()
+        return None
+    return handle
+
+
+class SpillBuffer:
+    """Capture buffer backed by a memory-mapped file on disk.
+
+    Drop-in for ``PCMBuffer`` in long recordings. The spill file grows in
+    fixed-size segments and only the segment being written is mapped, so
+    memory use stays flat however long the session runs. Every
+    ``commit_interval`` bytes the segment is flushed and its length appended
+    to ``journal.jsonl``; after a crash, ``recover_session`` rebuilds a WAV
+    from everything up to the last commit.
+    """
+
+    DATA = 'audio.pcm'
+    JOURNAL = 'journal.jsonl'
+    # Held for as long as the session is being recorded (see lock_session)
+    LOCK = 'lock'
+
+    def __init__(self, directory: Path, sample_rate: int, channels: int = 1,
+                 segment_size: int = 4 * 1024 * 1024, commit_interval: Optional[int] = None):
+        self.directory = Path(directory)
+        self.sample_rate = sample_rate
+        self.channels = channels
+        # Keep segments page-aligned so each can be mapped at its own offset
+        self.segment_size = max(mmap.ALLOCATIONGRANULARITY,
+                                segment_size // mmap.ALLOCATIONGRANULARITY * mmap.ALLOCATIONGRANULARITY)
+        # Default: commit about once per second of audio
+        self.commit_interval = commit_interval or sample_rate * channels * 2
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self._lock = lock_session(self.directory)
+        if self._lock is None:
+            raise RuntimeError(f"Session {self.directory} is already being recorded")
+        self._file = open(self.directory / self.DATA, 'w+b')
+        self._journal = open(self.directory / self.JOURNAL, 'a', encoding='utf-8')
+        self._segment = None
+        self._segment_start = 0
+        self._length = 0
+        self._committed = 0
+        self._read_map = None
+        self._log({'type': 'session', 'sample_rate': sample_rate, 'channels': channels,
+                   'started': time.time(), 'pid': os.getpid()})
+
+    @classmethod
+    def create(cls, root: Optional[Path] = None, sample_rate: int = 16000, channels: int = 1,
+               **kwargs) -> 'SpillBuffer':
+        """Start a new session in a fresh directory under ``root`` (default ~/.parle/sessions)."""
+        root = root or sessions_dir()
+        name = datetime.now().strftime('%Y%m%d_%H%M%S')
+        directory = root / name
+        suffix = 1
+        while directory.exists():
+            directory = root / f"{name}_{suffix}"
+            suffix += 1
+        return cls(directory, sample_rate, channels, **kwargs)
+
+    def __len__(self):
+        return self._length
+
+    def _log(self, record: dict):
+        self._journal.write(json.dumps(record) + '\n')
+        self._journal.flush()
+        os.fsync(self._journal.fileno())
+
+    def _map_segment(self, start: int):
+        self._file.truncate(start + self.segment_size)
+        self._segment = mmap.mmap(self._file.fileno(), self.segment_size, offset=start)
+        self._segment_start = start
+
+    def _close_segment(self):
+        if self._segment is not None:
+            self._segment.flush()
+            self._segment.close()
+            self._segment = None
+
+    def append(self, data):
+        data = memoryview(data).cast('B')
+        while len(data):
+            offset = self._length - self._segment_start
+            if self._segment is None or offset >= self.segment_size:
+                self._close_segment()
+                self._map_segment(self._length - self._length % self.segment_size)
+                offset = self._length - self._segment_start
+            count = min(len(data), self.segment_size - offset)
+            self._segment[offset:offset + count] = data[:count]
+            self._length += count
+            data = data[count:]
+        if self._length - self._committed >= self.commit_interval:
+            self.commit()
+
+    def commit(self):
+        """Make everything appended so far durable and record it in the journal."""
+        if self._length == self._committed:
+            return
+        if self._segment is not None:
+            self._segment.flush()
+        self._log({'type': 'commit', 'length': self._length})
+        self._committed = self._length
+
+    def clear(self):
+        self._close_segment()
+        self._release_read_map()
+        self._file.truncate(0)
+        self._length = 0
+        self._committed = 0
+        self._log({'type': 'commit', 'length': 0})
+
+    def _release_read_map(self):
+        if self._read_map is not None:
+            try:
+                self._read_map.close()
+            except BufferError:
+                # A view is still alive; the map goes when it does
+                pass
+            self._read_map = None
+
+    def _map_all(self):
+        self.commit()
+        self._close_segment()
+        self._release_read_map()
+        self._read_map = mmap.mmap(self._file.fileno(), self._length, access=mmap.ACCESS_READ)
+        return self._read_map
+
+    def view(self) -> memoryview:
+        """Read-only view of the whole recording, paged in from disk on demand."""
+        if not self._length:
+            return memoryview(b'')
+        return memoryview(self._map_all())[:self._length]
+
+    def as_array(self, dtype=np.int16) -> np.ndarray:
+        if not self._length:
+            return np.zeros(0, dtype=dtype)
+        itemsize = np.dtype(dtype).itemsize
+        return np.frombuffer(self._map_all(), dtype=dtype, count=self._length // itemsize)
+
+    def tobytes(self) -> bytes:
+        with self.view() as view:
+            return view.tobytes()
+
+    def close(self):
+        """Commit and close, leaving the session on disk for ``recover_session``."""
+        if self._file.closed:
+            return
+        self.commit()
+        self._close_segment()
+        self._release_read_map()
+        # Drop the unused tail of the last segment
+        self._file.truncate(self._length)
+        self._file.close()
+        self._journal.close()
+        self._lock.close()
+
+    def discard(self):
+        """Close and delete the session once its audio has been saved elsewhere."""
+        self.close()
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+
+def read_journal(directory: Path) -> Optional[dict]:
+    """Session header plus committed length, or None if there is no usable journal."""
+    try:
+        lines = (Path(directory) / SpillBuffer.JOURNAL).read_text(encoding='utf-8').splitlines()
+    except OSError:
+        return None
+    session = None
+    length = 0
+    for line in lines:
+        try:
+            record = json.loads(line)
+        except ValueError:
+            # A line cut short by the crash
+            continue
+        if record.get('type') == 'session':
+            session = record
+        elif record.get('type') == 'commit':
+            length = record['length']
+    if session is None:
+        return None
+    data = Path(directory) / SpillBuffer.DATA
+    size = data.stat().st_size if data.exists() else 0
+    frame = session['channels'] * 2
+    # Never trust more than is actually on disk, and end on a whole frame
+    length = min(length, size) // frame * frame
+    return dict(session, length=length, seconds=length / (session['sample_rate'] * frame))
+
+
+def list_sessions(root: Optional[Path] = None) -> List[Path]:
+    """Session directories left behind by interrupted recordings, oldest first.
+
+    Sessions still being recorded are left out.
+    """
+    root = root or sessions_dir()
+    if not root.exists():
+        return []
+    sessions = []
+    for path in sorted(root.iterdir()):
+        if not (path / SpillBuffer.JOURNAL).exists():
+            continue
+        lock = lock_session(path)
+        if lock is not None:
+            lock.close()
+            sessions.append(path)
+    return sessions
+
+
+def recover_session(directory: Path, output: Path, chunk_size: int = 1024 * 1024) -> dict:
+    """Write the committed audio of a session to a WAV file, streaming from disk."""
+    info = read_journal(directory)
+    if info is None:
+        raise RuntimeError(f"No journal found in {directory}")
+    remaining = info['length']
+    with open(Path(directory) / SpillBuffer.DATA, 'rb') as source, wave.open(str(output), 'wb') as wf:
+        wf.setnchannels(info['channels'])
+        wf.setsampwidth(2)
+        wf.setframerate(info['sample_rate'])
+        while remaining:
+            chunk = source.read(min(chunk_size, remaining))
+            if not chunk:
+                break
+            wf.writeframes(chunk)
+            remaining -= len(chunk)
+    return info
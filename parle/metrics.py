@@ -0,0 +1,166 @@
+import atexit
+import json
+import logging
+import os
+import re
+import threading
+import time
+from logging.handlers import RotatingFileHandler
+from pathlib import Path
+from typing import Optional
+
+
+class _NullSpan:
+    """Shared do-nothing span handed out while metrics are disabled."""
+
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+    def set(self, **attrs):
+        pass
+
+
+_NULL_SPAN = _NullSpan()
+
+
+class _Span:
+    __slots__ = ('metrics', 'name', 'attrs', 'started')
+
+    def __init__(self, metrics, name: str, attrs: dict):
+        self.metrics = metrics
+        self.name = name
+        self.attrs = attrs
+        self.started = None
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.metrics._finish_span(self, time.perf_counter() - self.started, exc)
+        return False
+
+    def set(self, **attrs):
+        self.attrs.update(attrs)
+
+
+class Metrics:
+    """Timed spans and counters written to a rotating JSONL log and a Prometheus textfile.
+
+    Disabled by default: ``span()`` then returns a shared no-op object and
+    ``count()``/``observe()`` return immediately, so instrumented code pays
+    next to nothing.
+    """
+
+    def __init__(self):
+        self.enabled = False
+        self.directory = None
+        self._lock = threading.Lock()
+        self._counters = {}
+        self._summaries = {}
+        self._logger = None
+        self._last_textfile = 0.0
+        self.textfile_interval = 1.0
+
+    def configure(self, enabled: bool = True, directory: Optional[Path] = None,
+                  max_bytes: int = 5 * 1024 * 1024, backups: int = 3):
+        self.enabled = enabled
+        if not enabled:
+            return
+        self.directory = directory or Path.home() / '.parle' / 'metrics'
+        self.directory.mkdir(parents=True, exist_ok=True)
+        if self._logger is None:
+            self._logger = logging.getLogger('parle.metrics')
+            self._logger.setLevel(logging.INFO)
+            self._logger.propagate = False
+            handler = RotatingFileHandler(self.directory / 'parle.jsonl', maxBytes=max_bytes,
+                                          backupCount=backups, encoding='utf-8')
+            handler.setFormatter(logging.Formatter('%(message)s'))
+            self._logger.addHandler(handler)
+            atexit.register(self.write_textfile)
+
+    def span(self, name: str, **attrs):
+        """Context manager timing a block; attributes can be added with ``span.set()``."""
+        if not self.enabled:
+            return _NULL_SPAN
+        return _Span(self, name, attrs)
+
+    def count(self, name: str, value: float = 1):
+        if not self.enabled:
+            return
+        with self._lock:
+            self._counters[name] = self._counters.get(name, 0) + value
+
+    def observe(self, name: str, value: float):
+        if not self.enabled:
+            return
+        with self._lock:
+            total, count = self._summaries.get(name, (0.0, 0))
+            self._summaries[name] = (total + value, count + 1)
+
+    def _finish_span(self, span: _Span, duration: float, exc):
+        self.observe(f"span:{span.name}", duration)
+        record = {'ts': round(time.time(), 3), 'span': span.name, 'duration': round(duration, 6)}
+        record.update(span.attrs)
+        if exc is not None:
+            record['error'] = repr(exc)
+            self.count(f"{span.name}.errors")
+        self._logger.info(json.dumps(record, default=str))
+
+        now = time.monotonic()
+        if now - self._last_textfile >= self.textfile_interval:
+            self._last_textfile = now
+            self.write_textfile()
+
+    @staticmethod
+    def _metric_name(name: str) -> str:
+        return 'parle_' + re.sub(r'[^a-zA-Z0-9_]', '_', name)
+
+    def write_textfile(self):
+        """Atomically rewrite ``parle.prom`` for the node_exporter textfile collector."""
+        if not self.enabled or self.directory is None:
+            return
+        with self._lock:
+            counters = dict(self._counters)
+            summaries = dict(self._summaries)
+
+        lines = []
+        spans = {name[5:]: value for name, value in summaries.items() if name.startswith('span:')}
+        if spans:
+            lines.append('# TYPE parle_span_seconds summary')
+            for name, (total, count) in sorted(spans.items()):
+                lines.append(f'parle_span_seconds_sum{{span="{name}"}} {total:.6f}')
+                lines.append(f'parle_span_seconds_count{{span="{name}"}} {count}')
+        for name, (total, count) in sorted(summaries.items()):
+            if name.startswith('span:'):
+                continue
+            metric = self._metric_name(name)
+            lines.append(f'# TYPE {metric} summary')
+            lines.append(f'{metric}_sum {total:.6f}')
+            lines.append(f'{metric}_count {count}')
+        for name, value in sorted(counters.items()):
+            metric = self._metric_name(name) + '_total'
+            lines.append(f'# TYPE {metric} counter')
+            lines.append(f'{metric} {value:g}')
+
+        path = self.directory / 'parle.prom'
+        temp = path.with_name(f'parle.prom.{os.getpid()}.tmp')
+        temp.write_text('\n'.join(lines) + '\n', encoding='utf-8')
+        os.replace(temp, path)
+
+
+metrics = Metrics()
+
+
+def setup_metrics(config=None):
+    """Enable metrics if PARLE_METRICS is set or the config has ``"metrics": true``."""
+    enabled = os.getenv('PARLE_METRICS', '').lower() in ('1', 'true', 'yes')
+    if config is not None and config.get('metrics', False):
+        enabled = True
+    if enabled:
+        metrics.configure()
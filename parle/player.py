@@ -2,34 +2,48 @@ import soundfile as sf
 import numpy as np
 from pathlib import Path
 import pyaudio
+import subprocess
+import threading
 import wave
+from collections import deque
+from typing import Optional
+
+from .converter import AudioConverter
 
 
 class AudioPlayer:
+    # Decoded audio is resampled to this format so any file can be streamed
+    SAMPLE_RATE = 44100
+    CHANNELS = 2
+    
+    _engine = None
+    
+    @staticmethod
+    def engine() -> 'PlaybackEngine':
+        """Shared playback engine, opened on first use and kept for later plays."""
+        if AudioPlayer._engine is None:
+            AudioPlayer._engine = PlaybackEngine(AudioPlayer.SAMPLE_RATE, AudioPlayer.CHANNELS)
+        return AudioPlayer._engine
+    
+    @staticmethod
+    def shutdown():
+        if AudioPlayer._engine is not None:
+            AudioPlayer._engine.close()
+            AudioPlayer._engine = None
+    
     @staticmethod
     def play_mp3(mp3_path: Path):
         if not mp3_path.exists():
             raise FileNotFoundError(f"MP3 file not found: {mp3_path}")
             
         print(f"Playing: {mp3_path.name}")
-        print("Note: Direct MP3 playback requires conversion to WAV first")
-        
-        temp_wav = mp3_path.with_suffix('.temp.wav')
-        
-        import subprocess
-        result = subprocess.run([
-            "ffmpeg", "-i", str(mp3_path), 
-            "-y", str(temp_wav)
-        ], capture_output=True, text=True)
         
-        if result.returncode != 0:
-            raise RuntimeError(f"Could not convert MP3 for playback: {result.stderr}")
-        
-        try:
-            AudioPlayer._play_with_pyaudio(temp_wav)
-        finally:
-            if temp_wav.exists():
-                temp_wav.unlink()
+        # Decoded PCM is streamed into the shared, already-open output device
+        engine = AudioPlayer.engine()
+        engine.play(mp3_path)
+        engine.wait()
+        if engine.error:
+            raise RuntimeError(f"Playback failed: {engine.error}")
         
         print("Playback finished.")
         
@@ -65,4 +79,185 @@ class AudioPlayer:
         stream.stop_stream()
         stream.close()
         p.terminate()
-        wf.close()
\ No newline at end of file
+        wf.close()
+
+
+class PlaybackEngine:
+    """Long-lived output stream that plays queued files back to back.
+
+    The PyAudio device is opened once and kept open. Files are decoded by
+    ffmpeg straight into it, and the next file's decoder is started while the
+    current one is still playing, so queued clips follow each other without a
+    gap. ``play``, ``stop`` and ``seek`` only post requests to the playback
+    thread and return immediately.
+    """
+
+    def __init__(self, sample_rate: int = 44100, channels: int = 2, chunk_frames: int = 1024):
+        self.sample_rate = sample_rate
+        self.channels = channels
+        self.chunk_bytes = chunk_frames * channels * 2
+        self.audio = pyaudio.PyAudio()
+        self.stream = self.audio.open(
+            format=pyaudio.paInt16,
+            channels=channels,
+            rate=sample_rate,
+            output=True,
+            frames_per_buffer=chunk_frames
+        )
+        self.current = None
+        self.position = 0.0
+        self.error = None
+        self._pending = deque()
+        self._seek_to = None
+        self._stop_current = False
+        self._flush = False
+        self._closed = False
+        self._idle = True
+        self._cond = threading.Condition()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def play(self, path: Path, start: float = 0.0):
+        """Queue ``path`` to play after whatever is already queued."""
+        with self._cond:
+            self._pending.append((Path(path), start))
+            self._idle = False
+            self._cond.notify_all()
+
+    def stop(self):
+        """Stop the current file and drop everything queued."""
+        with self._cond:
+            self._pending.clear()
+            self._stop_current = True
+            self._flush = True
+            self._cond.notify_all()
+
+    def skip(self):
+        """Stop the current file and move on to the next queued one."""
+        with self._cond:
+            self._stop_current = True
+
+    def seek(self, seconds: float):
+        """Jump to ``seconds`` into the current file."""
+        with self._cond:
+            self._seek_to = max(0.0, seconds)
+
+    @property
+    def playing(self) -> bool:
+        return not self._idle
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        """Block until the queue has finished playing."""
+        with self._cond:
+            return self._cond.wait_for(lambda: self._idle, timeout)
+
+    def close(self):
+        with self._cond:
+            self._closed = True
+            self._pending.clear()
+            self._stop_current = True
+            self._cond.notify_all()
+        self._thread.join()
+        self.stream.stop_stream()
+        self.stream.close()
+        self.audio.terminate()
+
+    def _open(self, path: Path, start: float) -> subprocess.Popen:
+        return AudioConverter.open_pcm_decoder(path, self.sample_rate, self.channels, start)
+
+    @staticmethod
+    def _kill(decoder: subprocess.Popen):
+        decoder.kill()
+        decoder.stdout.close()
+        decoder.wait()
+
+    def _run(self):
+        try:
+            self._loop()
+        finally:
+            # Never leave wait() hanging, even if the thread dies
+            with self._cond:
+                self._idle = True
+                self._cond.notify_all()
+
+    def _loop(self):
+        decoder, item = None, None
+        while True:
+            with self._cond:
+                if self._flush or self._closed:
+                    # stop() also discards a decoder started ahead of time
+                    if decoder:
+                        self._kill(decoder)
+                    decoder, item = None, None
+                    self._flush = False
+                if decoder is None:
+                    if not self._pending:
+                        self._idle = True
+                        self._cond.notify_all()
+                    self._cond.wait_for(lambda: self._pending or self._closed)
+                    if self._closed:
+                        break
+                    item = self._pending.popleft()
+                    self._flush = False
+                    try:
+                        decoder = self._open(*item)
+                    except Exception as e:
+                        self.error = e
+                        decoder = None
+                        continue
+                self.current, self.position = item
+                self._stop_current = False
+                self._seek_to = None
+                self.error = None
+
+            try:
+                decoder, item = self._play(decoder, *item)
+            except Exception as e:
+                # Output device lost or decoder failed mid-file: report it and go on
+                self.error = e
+                decoder, item = None, None
+            self.current = None
+
+    def _play(self, decoder: subprocess.Popen, path: Path, start: float):
+        """Play one file; returns the next file's pre-started decoder, if there is one."""
+        next_decoder, upcoming = None, None
+        bytes_per_second = self.sample_rate * self.channels * 2
+        written = 0
+        try:
+            while True:
+                with self._cond:
+                    stop, seek_to = self._stop_current, self._seek_to
+                    self._seek_to = None
+                    if next_decoder is None and self._pending and not stop:
+                        # Start decoding the next file now so it's ready the moment this one ends
+                        upcoming = self._pending.popleft()
+                        try:
+                            next_decoder = self._open(*upcoming)
+                        except RuntimeError:
+                            upcoming = None
+                if stop:
+                    break
+                if seek_to is not None:
+                    self._kill(decoder)
+                    decoder = self._open(path, seek_to)
+                    start, written = seek_to, 0
+                chunk = decoder.stdout.read(self.chunk_bytes)
+                if not chunk:
+                    break
+                self.stream.write(chunk)
+                written += len(chunk)
+                self.position = start + written / bytes_per_second
+        except BaseException:
+            # Don't leave ffmpeg processes behind when playback fails
+            for process in (decoder, next_decoder):
+                if process is not None:
+                    self._kill(process)
+            raise
+
+        if decoder.poll() is None:
+            self._kill(decoder)
+        else:
+            decoder.stdout.close()
+            if decoder.wait() != 0 and not written:
+                self.error = RuntimeError(f"could not decode {path.name}")
+        return next_decoder, upcoming
@@ -3,60 +3,286 @@ import wave
 import numpy as np
 from pathlib import Path
 from typing import Optional
+import queue
 import tempfile
+import threading
+
+from .buffer import PCMBuffer, RingBuffer
+from .journal import SpillBuffer
+from .metrics import metrics
+from .resample import StreamingResampler
 
 
 class AudioRecorder:
-    def __init__(self, sample_rate: int = 44100, channels: int = 1, chunk_size: int = 1024):
+    """Capture microphone audio as 16-bit PCM.
+
+    ``capture_mode`` selects how frames are pulled from PortAudio:
+    ``'blocking'`` reads them in ``record_chunk``, while ``'callback'`` lets
+    PortAudio push them from its own thread into a bounded queue that
+    ``record_chunk`` waits on, so the consumer sleeps instead of spinning.
+
+    ``sample_rate`` is the rate of the recorded PCM. If the device is opened
+    at a different ``device_rate`` (e.g. 44100 Hz hardware with 16000 Hz
+    output for speech), chunks are resampled as they arrive, before they
+    reach the buffer and any sinks.
+
+    ``arm()`` opens the stream ahead of time and keeps only the last few
+    hundred milliseconds in a ring buffer; ``start_capture()`` then starts
+    the recording from that pre-roll with no device-open delay, and
+    ``stop_capture()`` ends it while leaving the stream armed.
+
+    With ``spill_dir`` set, each recording goes to a journaled spill file in
+    a new session directory under it instead of RAM (see parle.journal);
+    ``journal`` is that session's buffer. The session stays on disk until
+    ``discard_journal()``, so an interrupted recording can be recovered.
+    """
+
+    def __init__(self, sample_rate: int = 44100, channels: int = 1, chunk_size: int = 1024,
+                 capture_mode: str = 'blocking', max_queued_chunks: int = 512,
+                 silence_compactor=None, device_rate: Optional[int] = None, audio=None,
+                 spill_dir: Optional[Path] = None):
+        if capture_mode not in ('blocking', 'callback'):
+            raise ValueError(f"Unknown capture mode: {capture_mode}")
         self.sample_rate = sample_rate
+        self.device_rate = device_rate or sample_rate
+        self.resampler = None
+        if self.device_rate != sample_rate:
+            self.resampler = StreamingResampler(self.device_rate, sample_rate, channels)
         self.channels = channels
         self.chunk_size = chunk_size
-        self.audio = pyaudio.PyAudio()
+        self.capture_mode = capture_mode
+        self.max_queued_chunks = max_queued_chunks
+        # Optional parle.vad.SilenceCompactor applied before the WAV is written
+        self.silence_compactor = silence_compactor
+        self.removed_seconds = 0.0
+        # A shared PyAudio instance (e.g. the daemon's) is left running on cleanup
+        self._owns_audio = audio is None
+        self.audio = audio or pyaudio.PyAudio()
         self.stream = None
-        self.frames = []
+        self.error = None
+        self.dropped_chunks = 0
+        self._queue = None
+        # Preallocate ~10 seconds of 16-bit PCM; grows as needed
+        self.buffer = PCMBuffer(sample_rate * channels * 2 * 10)
+        self.spill_dir = spill_dir
+        self.journal = None
+        self.sinks = []
+        # While armed, chunks go to the pre-roll ring instead of the buffer
+        self.preroll = None
+        self.capturing = True
+        self._route_lock = threading.Lock()
+        
+    def open_stream(self):
+        if self.spill_dir:
+            self._close_journal()
+            self.journal = self.buffer = SpillBuffer.create(self.spill_dir, self.sample_rate, self.channels)
+        self.buffer.clear()
+        if self.resampler:
+            self.resampler.reset()
+        self.error = None
+        self.dropped_chunks = 0
+        callback = None
+        if self.capture_mode == 'callback':
+            self._queue = queue.Queue(maxsize=self.max_queued_chunks)
+            callback = self._on_audio
+        with metrics.span('recorder.open', mode=self.capture_mode, rate=self.device_rate):
+            self.stream = self.audio.open(
+                format=pyaudio.paInt16,
+                channels=self.channels,
+                rate=self.device_rate,
+                input=True,
+                frames_per_buffer=self.chunk_size,
+                stream_callback=callback
+            )
+        
+    def _on_audio(self, in_data, frame_count, time_info, status):
+        # Runs on the PortAudio thread: never block here
+        try:
+            self._queue.put_nowait(in_data)
+        except queue.Full:
+            self.dropped_chunks += 1
+        return (None, pyaudio.paContinue)
         
     def start_recording(self):
-        self.frames = []
-        self.stream = self.audio.open(
-            format=pyaudio.paInt16,
-            channels=self.channels,
-            rate=self.sample_rate,
-            input=True,
-            frames_per_buffer=self.chunk_size
-        )
+        self.open_stream()
         print("Recording started... Press Enter to stop.")
         
-    def record_chunk(self) -> bool:
-        if self.stream:
-            try:
-                data = self.stream.read(self.chunk_size, exception_on_overflow=False)
-                self.frames.append(data)
-                return True
-            except Exception:
-                return False
-        return False
+    def arm(self, preroll: float = 0.5):
+        """Open the stream now, keeping the last ``preroll`` seconds until ``start_capture()``."""
+        self.preroll = RingBuffer(int(preroll * self.sample_rate) * self.channels * 2)
+        self.capturing = False
+        self.open_stream()
         
-    def stop_recording(self) -> Optional[Path]:
+    @property
+    def armed(self) -> bool:
+        return self.preroll is not None and self.stream is not None
+        
+    def start_capture(self):
+        """Start recording from the pre-roll; add sinks before calling this."""
+        with self._route_lock:
+            self.buffer.clear()
+            self.dropped_chunks = 0
+            preroll = self.preroll.tobytes()
+            self.preroll.clear()
+            if preroll:
+                self._append(preroll)
+            self.capturing = True
+        
+    def stop_capture(self) -> Optional[memoryview]:
+        """End a capture started with ``start_capture()``, leaving the stream armed.
+
+        Like ``stop_recording_pcm()``, the view must be released before the
+        next capture.
+        """
+        with self._route_lock:
+            self.capturing = False
+        return self._finish_pcm()
+        
+    def disarm(self):
+        """Close an armed stream that is not capturing, discarding the pre-roll."""
         if self.stream:
             self.stream.stop_stream()
             self.stream.close()
             self.stream = None
-            
-            if not self.frames:
+        self._queue = None
+        self.preroll = None
+        self.capturing = True
+        
+    def add_sink(self, sink):
+        """Forward every captured chunk to ``sink.write`` as soon as it is read."""
+        self.sinks.append(sink)
+        
+    def _store(self, data: bytes):
+        if self.resampler:
+            data = self.resampler.process(data)
+            if not data:
+                return
+        if self.preroll is None:
+            self._append(data)
+            return
+        with self._route_lock:
+            if self.capturing:
+                self._append(data)
+            else:
+                self.preroll.append(data)
+
+    def _append(self, data: bytes):
+        self.buffer.append(data)
+        for sink in self.sinks:
+            sink.write(data)
+        
+    def record_chunk(self, timeout: float = 0.1) -> bool:
+        """Consume one chunk of audio.
+
+        In callback mode this waits up to ``timeout`` seconds for the next
+        chunk and returns True even if none arrived. Returns False once the
+        stream is gone or capture failed; the exception is kept in ``error``.
+        """
+        if not self.stream:
+            return False
+        try:
+            if self._queue is not None:
+                try:
+                    data = self._queue.get(timeout=timeout)
+                except queue.Empty:
+                    return True
+            else:
+                data = self.stream.read(self.chunk_size, exception_on_overflow=False)
+            self._store(data)
+            return True
+        except Exception as e:
+            self.error = e
+            return False
+        
+    def _drain_queue(self):
+        while True:
+            try:
+                self._store(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        self._queue = None
+        
+    def stop_recording_pcm(self) -> Optional[memoryview]:
+        """Stop capturing and return the recorded PCM without touching disk.
+
+        The returned view points into the capture buffer; release it before
+        recording again on this instance.
+        """
+        if not self.stream:
+            return None
+        # stop_stream() returns only after the last callback has run
+        self.stream.stop_stream()
+        self.stream.close()
+        self.stream = None
+        if self._queue is not None:
+            self._drain_queue()
+        if self.resampler:
+            tail = self.resampler.flush()
+            if tail and self.capturing:
+                self._append(tail)
+        self.preroll = None
+        self.capturing = True
+        return self._finish_pcm()
+        
+    def _finish_pcm(self) -> Optional[memoryview]:
+        self.sinks = []
+        if self.journal:
+            self.journal.commit()
+        metrics.count('capture_seconds', len(self.buffer) / (self.sample_rate * self.channels * 2))
+        metrics.count('dropped_chunks', self.dropped_chunks)
+        
+        if not len(self.buffer):
+            return None
+        
+        self.removed_seconds = 0.0
+        if self.silence_compactor:
+            samples, self.removed_seconds = self.silence_compactor.compact(
+                self.buffer.as_array(), self.sample_rate, self.channels
+            )
+            metrics.count('silence_removed_seconds', self.removed_seconds)
+            if not len(samples):
                 return None
-                
-            temp_wav = Path(tempfile.mktemp(suffix=".wav"))
+            return memoryview(samples).cast('B')
+        return self.buffer.view()
+        
+    def stop_recording(self) -> Optional[Path]:
+        pcm = self.stop_recording_pcm()
+        if pcm is None:
+            return None
+        return self.write_wav(pcm)
+        
+    def write_wav(self, pcm: memoryview) -> Path:
+        """Write PCM to a temporary WAV file, releasing the view afterwards."""
+        temp_wav = Path(tempfile.mktemp(suffix=".wav"))
+        
+        with metrics.span('recorder.write_wav', bytes=len(pcm)), wave.open(str(temp_wav), 'wb') as wf:
+            wf.setnchannels(self.channels)
+            wf.setsampwidth(self.audio.get_sample_size(pyaudio.paInt16))
+            wf.setframerate(self.sample_rate)
+            with pcm:
+                wf.writeframes(pcm)
             
-            with wave.open(str(temp_wav), 'wb') as wf:
-                wf.setnchannels(self.channels)
-                wf.setsampwidth(self.audio.get_sample_size(pyaudio.paInt16))
-                wf.setframerate(self.sample_rate)
-                wf.writeframes(b''.join(self.frames))
-                
-            return temp_wav
-        return None
+        return temp_wav
         
+    def discard_journal(self):
+        """Delete the spill file once the recording has been saved elsewhere."""
+        if self.journal:
+            self.journal.discard()
+            self.journal = None
+            self.buffer = PCMBuffer()
+
+    def _close_journal(self):
+        if self.journal:
+            if len(self.journal):
+                self.journal.close()
+            else:
+                self.journal.discard()
+            self.journal = None
+
     def cleanup(self):
         if self.stream:
             self.stream.close()
-        self.audio.terminate()
\ No newline at end of file
+            self.stream = None
+        self._close_journal()
+        if self._owns_audio:
+            self.audio.terminate()
\ No newline at end of file
@@ -0,0 +1,74 @@
+from math import gcd
+
+import numpy as np
+from scipy.signal import firwin, upfirdn
+
+
+class StreamingResampler:
+    """Polyphase resampler for 16-bit PCM that works chunk by chunk.
+
+    Uses the same anti-aliasing filter as ``scipy.signal.resample_poly`` but
+    keeps just enough input history between calls that the output of
+    successive ``process()`` calls, followed by ``flush()``, matches
+    resampling the whole signal at once.
+    """
+
+    def __init__(self, source_rate: int, target_rate: int, channels: int = 1):
+        divisor = gcd(source_rate, target_rate)
+        self.up = target_rate // divisor
+        self.down = source_rate // divisor
+        self.channels = channels
+        max_rate = max(self.up, self.down)
+        half_len = 10 * max_rate
+        taps = firwin(2 * half_len + 1, 1.0 / max_rate, window=('kaiser', 5.0)) * self.up
+        # Zero-pad the front so the filter delay is a whole number of output
+        # samples; that many are trimmed from the start of the stream
+        pre_pad = self.down - half_len % self.down
+        self.filter = np.concatenate([np.zeros(pre_pad), taps])
+        self.delay = (half_len + pre_pad) // self.down
+        self.reset()
+
+    def reset(self):
+        self._history = np.zeros((0, self.channels), dtype=np.float32)
+        self._start = 0      # global index of _history[0]; always a multiple of down
+        self._received = 0   # input frames seen so far
+        self._next = self.delay  # next output frame to emit (before delay trim)
+
+    def _emit(self, last: int) -> bytes:
+        """Produce output frames ``_next..last`` from the retained history."""
+        if last < self._next or not len(self._history):
+            return b''
+        offset = self._start * self.up // self.down
+        y = upfirdn(self.filter, self._history, self.up, self.down, axis=0)
+        out = y[self._next - offset:last - offset + 1]
+        self._next = last + 1
+
+        # Drop history no longer needed for the next output frame
+        needed = -(-(self._next * self.down - (len(self.filter) - 1)) // self.up)
+        keep_from = max(0, needed) // self.down * self.down
+        if keep_from > self._start:
+            self._history = self._history[keep_from - self._start:]
+            self._start = keep_from
+
+        np.rint(out, out=out)
+        return np.clip(out, -32768, 32767, out=out).astype(np.int16).tobytes()
+
+    def process(self, data: bytes) -> bytes:
+        frames = np.frombuffer(data, dtype=np.int16).reshape(-1, self.channels)
+        if not len(frames):
+            return b''
+        self._history = np.concatenate([self._history, frames.astype(np.float32)])
+        self._received += len(frames)
+        # Last output frame whose input samples have all arrived
+        last = (self._received - 1) * self.up // self.down
+        return self._emit(last)
+
+    def flush(self) -> bytes:
+        """Emit the remaining output, padding the input with silence."""
+        total = -(-self._received * self.up // self.down)
+        last = total - 1 + self.delay
+        pad = np.zeros((len(self.filter) // self.up + self.down + 1, self.channels), dtype=np.float32)
+        self._history = np.concatenate([self._history, pad])
+        data = self._emit(last)
+        self.reset()
+        return data
@@ -0,0 +1,183 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Optional
+
+import numpy as np
+
+from .buffer import PCMBuffer
+from .converter import AudioConverter
+from .vad import frame_rms, is_silent
+
+
+class SegmentedTranscriber:
+    """Transcribe live audio segment by segment while it is still being recorded.
+
+    Attach it to an ``AudioRecorder`` with ``add_sink``. Incoming PCM is cut at
+    pauses and every finished segment is encoded and sent to the API in the
+    background, so ``finish()`` only has to wait for the trailing segment.
+    A segment that reaches ``max_segment`` without a pause is cut at the
+    quietest moment of its last ``cut_window`` seconds, and the audio after
+    that point starts the next segment, so words are not split in half.
+
+    ``on_segment``, if given, is called with each piece of the transcript as
+    soon as it and every earlier segment are done, in order, with the
+    separating space included: the pieces add up to what ``finish()``
+    returns. It runs on a worker thread.
+
+    A segment that still fails after the transcriber's own retries is sent
+    again up to ``segment_retries`` times. If it never succeeds, nothing after
+    it is passed to ``on_segment`` and ``finish()`` returns None, so a
+    transcript with a hole in it is never mistaken for a complete one.
+    """
+
+    def __init__(self, transcriber, sample_rate: int = 44100, channels: int = 1, bitrate: str = "16k",
+                 silence_threshold: float = 500, min_pause: float = 0.6,
+                 min_segment: float = 3.0, max_segment: float = 30.0, cut_window: float = 5.0,
+                 max_workers: int = 2, segment_retries: int = 1,
+                 silence_compactor=None, codec: str = 'mp3', policy=None,
+                 on_segment: Optional[Callable[[str], None]] = None):
+        self.transcriber = transcriber
+        self.sample_rate = sample_rate
+        self.channels = channels
+        self.bitrate = bitrate
+        self.silence_threshold = silence_threshold
+        self.min_pause = min_pause
+        self.min_segment = min_segment
+        self.max_segment = max_segment
+        self.cut_window = cut_window
+        self.segment_retries = segment_retries
+        self.silence_compactor = silence_compactor
+        self.codec = AudioConverter.codec(codec)
+        # Optional parle.adaptive.BitratePolicy choosing codec and bitrate per segment
+        self.policy = policy
+        self.bytes_per_second = sample_rate * channels * 2
+        self.segments = 0
+        self.removed_seconds = 0.0
+        self._segment = PCMBuffer(int(self.bytes_per_second * max_segment) + 4096)
+        self._silent_run = 0.0
+        self._voiced = False
+        self._futures = []
+        self._executor = ThreadPoolExecutor(max_workers=max_workers)
+        self.on_segment = on_segment
+        # Finished segments waiting for an earlier one before on_segment
+        self._results = {}
+        self._emitted = 0
+        self._emitted_text = False
+        # Set once a segment is lost for good; later ones are no longer emitted
+        self._failed = False
+        self._emit_lock = threading.Lock()
+
+    def write(self, data: bytes):
+        self._segment.append(data)
+        seconds = len(data) / self.bytes_per_second
+        if is_silent(np.frombuffer(data, dtype=np.int16), self.silence_threshold):
+            self._silent_run += seconds
+        else:
+            self._silent_run = 0.0
+            self._voiced = True
+        
+        length = len(self._segment) / self.bytes_per_second
+        if length >= self.min_segment and self._silent_run >= self.min_pause:
+            self._cut()
+        elif length >= self.max_segment:
+            self._cut(self._quietest_offset())
+
+    def _quietest_offset(self) -> int:
+        """Byte offset of the middle of the quietest 20 ms near the end of the segment."""
+        frame = max(1, self.sample_rate // 50) * self.channels
+        # Never leave less than min_segment before the cut
+        window = min(self.cut_window, self.max_segment - self.min_segment)
+        samples = self._segment.as_array()
+        start = max(0, len(samples) - int(window * self.sample_rate) * self.channels)
+        levels = frame_rms(samples[start:], frame)
+        del samples
+        if not len(levels):
+            return len(self._segment)
+        middle = start + int(np.argmin(levels)) * frame + frame // 2
+        return (middle - middle % self.channels) * 2
+
+    def _cut(self, at: Optional[int] = None):
+        """Send the segment up to byte ``at`` (all of it by default); the rest starts the next one."""
+        if at is None:
+            at = len(self._segment)
+        with self._segment.view() as view:
+            carry = view[at:].tobytes()
+        # Segments with no speech at all are dropped instead of uploaded
+        if self._voiced and at:
+            if self.silence_compactor:
+                samples, removed = self.silence_compactor.compact(
+                    self._segment.as_array()[:at // 2], self.sample_rate, self.channels
+                )
+                self.removed_seconds += removed
+                pcm = samples.tobytes()
+                del samples
+            else:
+                with self._segment.view() as view:
+                    pcm = view[:at].tobytes()
+            self.segments += 1
+            self._futures.append(self._executor.submit(self._run_segment, pcm, self.segments))
+        self._segment.clear()
+        self._segment.append(carry)
+        self._silent_run = min(self._silent_run, len(carry) / self.bytes_per_second)
+        self._voiced = bool(carry) and not is_silent(np.frombuffer(carry, dtype=np.int16), self.silence_threshold)
+
+    def _run_segment(self, pcm: bytes, index: int) -> Optional[str]:
+        text = None
+        for retry in range(self.segment_retries + 1):
+            if retry:
+                print(f"Retrying segment {index}")
+            try:
+                text = self._transcribe_segment(pcm, index)
+            except Exception as e:
+                print(f"Segment {index} failed: {e}")
+            if text is not None:
+                break
+        # Emit before returning so finish() never sees a result that wasn't handed out
+        if self.on_segment:
+            self._emit(index, text)
+        return text
+
+    def _emit(self, index: int, text: Optional[str]):
+        with self._emit_lock:
+            self._results[index] = text
+            while self._emitted + 1 in self._results:
+                self._emitted += 1
+                text = self._results.pop(self._emitted)
+                if text is None:
+                    self._failed = True
+                if text and not self._failed:
+                    self.on_segment(" " + text if self._emitted_text else text)
+                    self._emitted_text = True
+
+    def _transcribe_segment(self, pcm: bytes, index: int) -> Optional[str]:
+        if self.policy:
+            audio, suffix, _ = self.policy.encode(pcm, self.sample_rate, self.channels)
+        else:
+            audio = self.codec.encode(pcm, self.sample_rate, self.channels, self.bitrate)
+            suffix = self.codec.suffix
+        return self.transcriber.transcribe(audio, f"segment_{index}{suffix}")
+
+    def finish(self) -> Optional[str]:
+        """Send the trailing segment and return the joined transcript, in order.
+
+        Returns None if any segment could not be transcribed.
+        """
+        self._cut()
+        texts = []
+        failed = []
+        for index, future in enumerate(self._futures, 1):
+            text = future.result()
+            if text is None:
+                failed.append(index)
+            elif text:
+                texts.append(text)
+        self._futures = []
+        self._executor.shutdown()
+        if failed:
+            print(f"Transcription failed for segments {', '.join(str(i) for i in failed)} of {self.segments}")
+            return None
+        return " ".join(texts) if texts else None
+
+    def cancel(self):
+        self._futures = []
+        self._executor.shutdown(wait=False, cancel_futures=True)
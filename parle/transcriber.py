@@ -1,56 +1,296 @@
+import io
 import os
+import random
+import re
+import threading
+import time
+import numpy as np
 import requests
+from concurrent.futures import ThreadPoolExecutor
+from email.utils import parsedate_to_datetime
 from pathlib import Path
-from typing import Optional
+from typing import BinaryIO, List, Optional, Union
 from dotenv import load_dotenv
 
+from .adaptive import LinkEstimator
+from .backends import CONTENT_TYPES, TranscriptionBackend, get_backend, sniff_suffix
+from .converter import AudioConverter
+from .metrics import metrics
+from .vad import split_at_pauses
+
 load_dotenv()
 
 
+def _words(text: str) -> List[str]:
+    return [re.sub(r'\W+', '', word).lower() for word in text.split()]
+
+
+def merge_overlap(previous: str, text: str, max_words: int = 20) -> str:
+    """Drop the start of ``text`` that repeats the end of ``previous``.
+
+    Used where two segments were cut with overlapping audio, so the words in
+    the overlap come back in both transcripts. Punctuation and case are
+    ignored when comparing.
+    """
+    tail = _words(previous)[-max_words:]
+    words = text.split()
+    head = _words(text)[:max_words]
+    for size in range(min(len(tail), len(head)), 0, -1):
+        if tail[-size:] == head[:size]:
+            return " ".join(words[size:])
+    return text
+
+
 class AudioTranscriber:
-    def __init__(self, language: str = "fr"):
-        self.api_key = os.getenv('DEEPINFRA_API_KEY')
-        if not self.api_key:
-            raise ValueError("DEEPINFRA_API_KEY not found in environment variables")
-        
-        self.api_url = "https://api.deepinfra.com/v1/openai/audio/transcriptions"
+    # Responses worth another attempt; anything else fails straight away
+    RETRY_STATUSES = (429, 500, 502, 503, 504)
+    # Long audio is decoded at this rate before being split
+    SEGMENT_RATE = 16000
+
+    def __init__(self, language: str = "fr", api_url: Optional[str] = None, timeout: float = 60,
+                 max_retries: int = 3, backoff_base: float = 0.5, backoff_max: float = 8.0,
+                 cache=None, backend: Union[str, TranscriptionBackend] = 'deepinfra',
+                 max_segment: Optional[float] = 120.0, max_workers: int = 4, segment_retries: int = 1,
+                 codec: str = 'opus', rate_limiter=None):
+        if isinstance(backend, str):
+            backend = get_backend(backend, api_url=api_url or os.getenv('PARLE_API_URL'))
+        self.backend = backend
+        self.api_key = backend.api_key
+        self.api_url = backend.api_url
+        self.model = backend.model
         self.language = language
+        # Optional parle.cache.TranscriptionCache consulted before uploading
+        self.cache = cache
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        # Audio longer than max_segment seconds is split at pauses and the
+        # pieces uploaded concurrently (None sends everything in one request)
+        self.max_segment = max_segment
+        self.max_workers = max_workers
+        self.segment_retries = segment_retries
+        # Format long-audio segments are re-encoded to (see converter.CODECS)
+        self.codec = codec
+        # Optional parle.batch.RateLimiter, acquired before every HTTP attempt
+        self.rate_limiter = rate_limiter
+        # Timing of each HTTP attempt, kept per thread (see last_attempts)
+        self._local = threading.local()
+        # Latency and throughput seen so far, for parle.adaptive.BitratePolicy
+        self.link = LinkEstimator()
+        
+        # One keep-alive session so repeated calls reuse the TCP+TLS connection
+        self.session = requests.Session()
+        adapter = requests.adapters.HTTPAdapter(pool_connections=1, pool_maxsize=8)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+        self.session.headers.update(backend.headers())
+        self._keepalive_stop = None
+        
+    @property
+    def last_attempts(self) -> list:
+        """Status and timing of each HTTP attempt of this thread's last transcribe() call."""
+        return getattr(self._local, 'attempts', [])
         
-    def transcribe(self, audio_path: Path) -> Optional[str]:
-        if not audio_path.exists():
-            raise FileNotFoundError(f"Audio file not found: {audio_path}")
+    def warm(self) -> bool:
+        """Open (or refresh) a pooled connection to the API host."""
+        try:
+            started = time.perf_counter()
+            self.session.head(self.api_url, timeout=5)
+            self.link.record_rtt(time.perf_counter() - started)
+            return True
+        except requests.exceptions.RequestException:
+            return False
         
+    def start_keepalive(self, interval: float = 45):
+        """Warm the connection now and keep it alive from a background thread."""
+        if self._keepalive_stop:
+            return
+        self._keepalive_stop = threading.Event()
         
-        headers = {
-            "Authorization": f"Bearer {self.api_key}"
-        }
+        def keepalive(stop):
+            while True:
+                self.warm()
+                if stop.wait(interval):
+                    break
         
-        with open(audio_path, 'rb') as audio_file:
+        threading.Thread(target=keepalive, args=(self._keepalive_stop,), daemon=True).start()
+        
+    def close(self):
+        if self._keepalive_stop:
+            self._keepalive_stop.set()
+            self._keepalive_stop = None
+        self.session.close()
+        
+    def _backoff(self, attempt: int, retry_after: Optional[str] = None) -> float:
+        if retry_after:
+            try:
+                delay = float(retry_after)
+            except ValueError:
+                try:
+                    delay = parsedate_to_datetime(retry_after).timestamp() - time.time()
+                except (TypeError, ValueError):
+                    delay = None
+            if delay is not None:
+                return min(max(delay, 0.0), 60.0)
+        # Full jitter: spread retries out so clients don't synchronise
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * (2 ** attempt)))
+        
+    def transcribe(self, audio: Union[Path, bytes, BinaryIO], filename: str = "audio.mp3") -> Optional[str]:
+        """Transcribe an audio file path, in-memory bytes, or a binary file object.
+
+        ``filename`` is only used for bytes and file objects, to name the upload.
+        """
+        if isinstance(audio, (str, Path)):
+            audio = Path(audio)
+            if not audio.exists():
+                raise FileNotFoundError(f"Audio file not found: {audio}")
+            filename = audio.name
+        elif not isinstance(audio, (bytes, bytearray, memoryview)):
+            audio = audio.read()
+        if not isinstance(audio, Path):
+            # Name the upload after what the bytes really are, so the
+            # backend sends the matching MIME type
+            suffix = sniff_suffix(audio)
+            if suffix and CONTENT_TYPES[suffix] != self.backend.content_type(filename):
+                filename = Path(filename).stem + suffix
+        
+        key = None
+        if self.cache:
+            key = self.cache.key(audio, self.language, self.model)
+            cached = self.cache.get(key)
+            if cached is not None:
+                self._local.attempts = []
+                metrics.count('cache_hits')
+                return cached
+            metrics.count('cache_misses')
+        
+        # In-memory audio is cheap to probe, and its length feeds the link estimate
+        duration = AudioConverter.duration(audio) if self.max_segment or not isinstance(audio, Path) else None
+        # Concurrent segment uploads share the link, so they don't say much about it
+        segmented = bool(self.max_segment and duration and duration > self.max_segment)
+        samples = None
+        if segmented:
+            try:
+                samples = AudioConverter.decode(audio, self.SEGMENT_RATE)
+            except Exception as e:
+                # Can't split what can't be decoded: send it whole instead
+                print(f"Could not decode audio for splitting, uploading it in one piece: {e}")
+                segmented = False
+        if segmented:
+            with metrics.span('transcribe.segmented', backend=self.backend.name, duration=duration) as span:
+                text, size = self._transcribe_segments(samples, Path(filename).stem)
+                span.set(attempts=len(self.last_attempts), ok=text is not None)
+        else:
+            size = audio.stat().st_size if isinstance(audio, Path) else len(audio)
+            with metrics.span('transcribe.upload', backend=self.backend.name, bytes=size) as span:
+                if isinstance(audio, Path):
+                    with open(audio, 'rb') as audio_file:
+                        text = self._transcribe_file(audio_file, filename)
+                else:
+                    text = self._transcribe_file(io.BytesIO(audio), filename)
+                span.set(attempts=len(self.last_attempts), ok=text is not None)
+        
+        metrics.count('upload_bytes', size)
+        metrics.count('upload_retries', max(len(self.last_attempts) - 1, 0))
+        if text is None:
+            metrics.count('transcribe_failures')
+        for attempt in self.last_attempts:
+            metrics.observe('server_latency_seconds', attempt['elapsed'])
+            if attempt['status'] == 200 and not segmented and duration:
+                self.link.record_upload(size, duration, attempt['elapsed'])
+        
+        if text is not None and key:
+            self.cache.put(key, text)
+        return text
+        
+    def _transcribe_segments(self, samples: np.ndarray, stem: str):
+        """Split long audio (mono samples at SEGMENT_RATE) at pauses and transcribe the pieces concurrently.
+
+        Segments that still fail after their own retries get ``segment_retries``
+        more rounds; the rest are not uploaded again. Returns the joined text
+        (None if any segment failed) and the number of bytes uploaded.
+        """
+        sample_rate = self.SEGMENT_RATE
+        plan = split_at_pauses(samples, sample_rate, self.max_segment)
+        texts = [None] * len(plan)
+        sizes = [0] * len(plan)
+        attempts = []
+        
+        codec = AudioConverter.codec(self.codec)
+        
+        def transcribe_segment(index):
+            start, end, _ = plan[index]
+            encoded = codec.encode(samples[start:end].tobytes(), sample_rate, 1, "16k")
+            sizes[index] += len(encoded)
+            text = self._transcribe_file(io.BytesIO(encoded), f"{stem}_{index + 1}{codec.suffix}")
+            return text, self.last_attempts
+        
+        pending = list(range(len(plan)))
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            for retry in range(self.segment_retries + 1):
+                futures = {index: executor.submit(transcribe_segment, index) for index in pending}
+                pending = []
+                for index, future in futures.items():
+                    try:
+                        texts[index], segment_attempts = future.result()
+                        attempts.extend(segment_attempts)
+                    except Exception as e:
+                        print(f"Segment {index + 1}/{len(plan)} failed: {e}")
+                    if texts[index] is None:
+                        pending.append(index)
+                if not pending:
+                    break
+                if retry < self.segment_retries:
+                    print(f"Retrying {len(pending)} of {len(plan)} segments")
+        
+        self._local.attempts = attempts
+        if pending:
+            print(f"Transcription failed for segments {', '.join(str(i + 1) for i in pending)} of {len(plan)}")
+            return None, sum(sizes)
+        
+        joined = texts[0]
+        for (_, _, overlapped), text in zip(plan[1:], texts[1:]):
+            if overlapped:
+                text = merge_overlap(joined, text)
+            joined = f"{joined} {text}" if joined and text else joined or text
+        return joined, sum(sizes)
+        
+    def _transcribe_file(self, audio_file: BinaryIO, filename: str) -> Optional[str]:
+        data = self.backend.form_data(self.language)
+        attempts = []
+        self._local.attempts = attempts
+        
+        for attempt in range(self.max_retries + 1):
+            audio_file.seek(0)
             files = {
-                'file': (audio_path.name, audio_file, 'audio/mpeg')
+                'file': (filename, audio_file, self.backend.content_type(filename))
             }
-            
-            data = {
-                'model': 'mistralai/Voxtral-Mini-3B-2507',
-                'language': self.language,
-                'response_format': 'text'
-            }
-            
+            retry_after = None
+            if self.rate_limiter:
+                self.rate_limiter.acquire()
+            started = time.perf_counter()
             try:
-                response = requests.post(
+                response = self.session.post(
                     self.api_url,
-                    headers=headers,
                     files=files,
                     data=data,
-                    timeout=60
+                    timeout=self.timeout
                 )
-                
-                if response.status_code == 200:
-                    return response.text.strip()
-                else:
-                    print(f"Transcription failed: {response.status_code} - {response.text}")
-                    return None
-                    
             except requests.exceptions.RequestException as e:
-                print(f"Error during transcription: {e}")
-                return None
\ No newline at end of file
+                attempts.append({'status': None, 'elapsed': time.perf_counter() - started, 'error': str(e)})
+                error = f"Error during transcription: {e}"
+            else:
+                attempts.append({'status': response.status_code, 'elapsed': time.perf_counter() - started})
+                if response.status_code == 200:
+                    return self.backend.parse(response)
+                error = f"Transcription failed: {response.status_code} - {response.text}"
+                if response.status_code not in self.RETRY_STATUSES:
+                    break
+                retry_after = response.headers.get('Retry-After')
+            
+            if attempt < self.max_retries:
+                time.sleep(self._backoff(attempt, retry_after))
+    
+        print(error)
+        return None
@@ -8,7 +8,6 @@ import os
 import subprocess
 from pathlib import Path
 from datetime import datetime
-import pyaudio
 import pyperclip
 import keyboard
 import pystray
@@ -16,23 +15,71 @@ from PIL import Image, ImageDraw
 from plyer import notification
 
 from .recorder import AudioRecorder
-from .converter import AudioConverter
+from .converter import AudioConverter, StreamingEncoder
+from .player import AudioPlayer
 from .transcriber import AudioTranscriber
+from .adaptive import BitratePolicy
+from .catalog import Catalog
+from .streaming import SegmentedTranscriber
+from .vad import SilenceCompactor
 from .config import Config
+from .metrics import metrics, setup_metrics
 
 
 class VoiceInputTray:
     def __init__(self):
         self.recording = False
         self.recorder = None
+        # Long-lived recorder kept open between dictations when always_armed is set
+        self.armed_recorder = None
+        self.arm_thread = None
+        # Whether the current recording runs on the armed recorder; the lock
+        # hands that recorder between the pump thread and start/stop
+        self.capture_armed = False
+        self._arm_lock = threading.Lock()
+        self.encoder = None
+        self.segmenter = None
+        # Job id taken at start by a recording that pastes segment by segment
+        self.current_job = None
+        self.last_recording = None
         self.config = Config()
-        self.transcriber = AudioTranscriber(language=self.config.get('language', 'en'))
+        setup_metrics(self.config)
+        self.transcriber = AudioTranscriber(
+            language=self.config.get('language', 'en'),
+            backend=self.config.get('backend', 'deepinfra'),
+            api_url=self.config.get('api_url'),
+            max_segment=self.config.get('max_segment', 120),
+            max_workers=self.config.get('transcribe_workers', 4),
+            codec=self.config.get('codec', 'opus')
+        )
+        # "bitrate": "auto" picks codec and bitrate per job from the measured link
+        self.bitrate = self.config.get('bitrate', 'auto')
+        self.policy = None
+        if self.bitrate == 'auto':
+            self.policy = BitratePolicy(self.transcriber.link, self.config.get('min_bitrate', '12k'))
+            self.bitrate = '16k'
+        # Dictations can be registered for `parle search`, written in the background;
+        # they often hold private text, so that is opt-in
+        self.catalog = Catalog() if self.config.get('catalog_dictation', False) else None
+        blocker = self.stream_encode_blocker()
+        if self.config.get('stream_encode', False) and blocker:
+            print(f"stream_encode has no effect until you {blocker} in the config")
+        # Stopped recordings waiting for a worker, pasted in recording order
         self.audio_queue = queue.Queue()
+        self._jobs_lock = threading.Lock()
+        # Held while pasting, which keeps pastes in order without blocking stop
+        self._paste_lock = threading.Lock()
+        self._finished = {}
+        # Segments pasted early but held back behind an earlier recording
+        self._held_segments = {}
+        self._next_job = 0
+        self._next_paste = 0
+        self.start_workers(self.config.get('pipeline_workers', 2))
         self.icon = None
         self.last_hotkey_time = 0
         self.current_hotkey = None
         
-    def create_icon_image(self, recording=False):
+    def create_icon_image(self, recording=False, pending=0):
         """Create a simple microphone icon"""
         size = 64
         image = Image.new('RGBA', (size, size), (0, 0, 0, 0))
@@ -53,8 +100,20 @@ class VoiceInputTray:
             # Recording indicator
             draw.ellipse([48, 8, 56, 16], fill=(255, 0, 0, 255))
         
+        if pending:
+            # Badge with the number of recordings still being transcribed
+            draw.ellipse([38, 38, 62, 62], fill=(255, 160, 0, 255))
+            draw.text((47, 44), str(min(pending, 9)), fill=(0, 0, 0, 255))
+        
         return image
     
+    def notify(self, title: str, message: str, timeout: int = 2):
+        """Show a notification without blocking; plyer waits out the timeout on Windows"""
+        threading.Thread(
+            target=lambda: notification.notify(title=title, message=message, timeout=timeout),
+            daemon=True
+        ).start()
+    
     def play_beep(self, frequency, duration):
         """Play a beep sound"""
         if not ((frequency == 1000 and self.config.get('beep_on_start', True)) or 
@@ -66,110 +125,378 @@ class VoiceInputTray:
             # Fallback if beep doesn't work
             pass
     
+    def stream_encode_blocker(self):
+        """The setting that keeps stream_encode from taking effect, or None"""
+        if self.config.get('streaming_transcription', True):
+            return 'set "streaming_transcription" to false'
+        if self.config.get('trim_silence', True):
+            return 'set "trim_silence" to false'
+        if self.config.get('codec', 'opus') != 'mp3':
+            return 'set "codec" to "mp3"'
+        if self.policy:
+            return 'set "bitrate" to a fixed value such as "16k"'
+        return None
+    
+    def create_recorder(self) -> AudioRecorder:
+        compactor = None
+        if self.config.get('trim_silence', True):
+            compactor = SilenceCompactor(max_pause=self.config.get('max_pause', 0.5))
+        return AudioRecorder(
+            sample_rate=self.config.get('sample_rate', 16000),
+            device_rate=self.config.get('device_rate', 44100),
+            capture_mode=self.config.get('capture_mode', 'callback'),
+            silence_compactor=compactor
+        )
+    
+    def arm(self):
+        """Keep the microphone open with a pre-roll ring buffer so capture starts instantly"""
+        recorder = self.create_recorder()
+        try:
+            recorder.arm(self.config.get('preroll', 0.5))
+        except Exception as e:
+            print(f"Could not arm capture, opening the device per recording: {e}")
+            recorder.cleanup()
+            return
+        self.armed_recorder = recorder
+        
+        def pump():
+            while self.armed_recorder is recorder:
+                if not recorder.record_chunk():
+                    break
+            if recorder.error:
+                print(f"Armed capture stopped: {recorder.error}")
+                # Fall back to opening the device per recording
+                with self._arm_lock:
+                    if self.armed_recorder is recorder:
+                        self.armed_recorder = None
+                    in_use = self.recording and self.recorder is recorder
+                # A capture still running on it is closed by stop instead
+                if not in_use:
+                    recorder.disarm()
+                    recorder.cleanup()
+        
+        self.arm_thread = threading.Thread(target=pump, daemon=True)
+        self.arm_thread.start()
+    
+    def disarm(self):
+        recorder, self.armed_recorder = self.armed_recorder, None
+        if recorder:
+            self.arm_thread.join()
+            recorder.disarm()
+            recorder.cleanup()
+    
     def start_recording(self):
         """Start recording audio"""
         if self.recording:
             return
             
-        self.recording = True
-        self.recorder = AudioRecorder()
+        with self._arm_lock:
+            self.recording = True
+            self.recorder = self.armed_recorder
+        armed = self.capture_armed = self.recorder is not None
+        if not armed:
+            self.recorder = self.create_recorder()
+        compactor = self.recorder.silence_compactor
+        
+        # Transcribe finished segments while still capturing, or
+        # optionally encode to MP3 while capturing
+        codec = self.config.get('codec', 'opus')
+        if self.config.get('streaming_transcription', True):
+            on_segment = None
+            if self.config.get('incremental_paste', False):
+                # Segments are pasted while recording, so the job needs its
+                # place in the paste order now rather than at stop
+                with self._jobs_lock:
+                    self.current_job = job_id = self._next_job
+                    self._next_job += 1
+                on_segment = lambda text: self.paste_segment(job_id, text)
+            self.segmenter = SegmentedTranscriber(
+                self.transcriber,
+                self.recorder.sample_rate,
+                self.recorder.channels,
+                self.bitrate,
+                min_pause=self.config.get('segment_pause', 0.6),
+                silence_compactor=compactor,
+                codec=codec,
+                policy=self.policy,
+                segment_retries=self.transcriber.segment_retries,
+                on_segment=on_segment
+            )
+            self.recorder.add_sink(self.segmenter)
+        elif self.config.get('stream_encode', False) and not self.stream_encode_blocker():
+            self.encoder = StreamingEncoder(
+                None,
+                self.recorder.sample_rate,
+                self.recorder.channels,
+                self.bitrate
+            ).start()
+            self.recorder.add_sink(self.encoder)
+        
+        if armed:
+            # The stream is already open: start from the pre-roll right away,
+            # before the beep and notification below can hold us up
+            self.recorder.start_capture()
+        else:
+            # Start recording in background
+            def record_audio():
+                try:
+                    self.recorder.open_stream()
+                    while self.recording:
+                        if not self.recorder.record_chunk():
+                            break
+                except Exception as e:
+                    self.recorder.error = e
+                if self.recorder.error:
+                    print(f"Recording error: {self.recorder.error}")
+            
+            self.record_thread = threading.Thread(target=record_audio, daemon=True)
+            self.record_thread.start()
         
         # Play start beep (higher pitch)
         threading.Thread(target=lambda: self.play_beep(1000, 200), daemon=True).start()
         
         # Update tray icon
         if self.icon:
-            self.icon.icon = self.create_icon_image(recording=True)
+            self.icon.icon = self.create_icon_image(recording=True, pending=self.queue_depth)
         
         # Show notification
-        notification.notify(
+        self.notify(
             title='Voice Input',
             message='Recording... Press Ctrl+Shift+R again to stop',
             timeout=2
         )
-        
-        # Start recording in background
-        def record_audio():
-            self.recorder.frames = []
-            self.recorder.stream = self.recorder.audio.open(
-                format=pyaudio.paInt16,
-                channels=self.recorder.channels,
-                rate=self.recorder.sample_rate,
-                input=True,
-                frames_per_buffer=self.recorder.chunk_size
-            )
-            
-            while self.recording:
-                try:
-                    self.recorder.record_chunk()
-                except Exception as e:
-                    print(f"Recording error: {e}")
-                    break
-        
-        self.record_thread = threading.Thread(target=record_audio, daemon=True)
-        self.record_thread.start()
     
     def stop_recording_and_transcribe(self):
-        """Stop recording and transcribe the audio"""
+        """Stop recording and queue the audio for transcription"""
         if not self.recording:
             return
             
-        self.recording = False
+        with self._arm_lock:
+            self.recording = False
+            # The armed pump failed during this capture and left the recorder to us
+            failed = self.capture_armed and self.recorder is not self.armed_recorder
+        stopped_at = time.perf_counter()
         
         # Play stop beep (lower pitch)
         threading.Thread(target=lambda: self.play_beep(600, 200), daemon=True).start()
         
         # Update tray icon
         if self.icon:
-            self.icon.icon = self.create_icon_image(recording=False)
+            self.icon.icon = self.create_icon_image(recording=False, pending=self.queue_depth)
         
-        # Stop recording
-        wav_path = self.recorder.stop_recording()
-        self.recorder.cleanup()
+        if self.capture_armed:
+            pcm = self.recorder.stop_capture()
+            if failed:
+                self.recorder.disarm()
+                self.recorder.cleanup()
+        else:
+            # Stop recording once the capture thread has consumed its last chunk
+            self.record_thread.join()
+            pcm = self.recorder.stop_recording_pcm()
+            self.recorder.cleanup()
+        encoder, self.encoder = self.encoder, None
+        segmenter, self.segmenter = self.segmenter, None
+        job_id, self.current_job = self.current_job, None
         
-        if wav_path:
-            notification.notify(
-                title='Voice Input',
-                message='Processing transcription...',
-                timeout=2
-            )
-            
-            # Convert to MP3
-            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-            mp3_path = Path(f"temp_recording_{timestamp}.mp3")
-            mp3_path = AudioConverter.wav_to_mp3(wav_path, mp3_path, '16k')
-            AudioConverter.cleanup_temp_file(wav_path)
-            
-            # Transcribe
+        if pcm is None:
+            if encoder:
+                encoder.abort()
+            if segmenter:
+                segmenter.cancel()
+            if job_id is not None:
+                # Release the paste order slot taken at start, off the hotkey thread
+                threading.Thread(target=self.deliver, args=({'id': job_id, 'incremental': True}, None),
+                                 daemon=True).start()
+            return
+        
+        # Keep a copy of the PCM only if the worker still has to encode it;
+        # the recorder's buffer is reused by the next recording
+        keep = self.config.get('keep_recordings', False)
+        needs_pcm = keep if segmenter else not encoder
+        with pcm:
+            audio = bytes(pcm) if needs_pcm else None
+            duration = len(pcm) / (self.recorder.sample_rate * self.recorder.channels * 2)
+        
+        with self._jobs_lock:
+            if job_id is None:
+                job_id = self._next_job
+                self._next_job += 1
+            job = {
+                'id': job_id,
+                'pcm': audio,
+                'sample_rate': self.recorder.sample_rate,
+                'channels': self.recorder.channels,
+                'encoder': encoder,
+                'segmenter': segmenter,
+                'removed': self.recorder.removed_seconds,
+                'keep': keep,
+                'duration': duration,
+                'stopped_at': stopped_at,
+                # Already pasted segment by segment
+                'incremental': segmenter is not None and segmenter.on_segment is not None,
+            }
+        self.audio_queue.put(job)
+        self.update_queue_depth()
+        
+        self.notify(
+            title='Voice Input',
+            message='Processing transcription...',
+            timeout=2
+        )
+    
+    def start_workers(self, count: int = 2):
+        """Process queued recordings in the background so the hotkey stays responsive"""
+        for _ in range(count):
+            threading.Thread(target=self.process_jobs, daemon=True).start()
+    
+    def process_jobs(self):
+        while True:
+            job = self.audio_queue.get()
+            transcription = None
             try:
-                transcription = self.transcriber.transcribe(mp3_path)
-                
-                if transcription:
-                    # Copy to clipboard
-                    pyperclip.copy(transcription)
-                    
-                    # Clean up temp file
-                    mp3_path.unlink(missing_ok=True)
-                    
-                    # Paste to active window
-                    time.sleep(0.1)  # Small delay to ensure focus
-                    
-                    # Simulate Ctrl+V
-                    keyboard.press_and_release('ctrl+v')
-                else:
-                    notification.notify(
-                        title='Voice Input Error',
-                        message='Transcription failed',
-                        timeout=3
-                    )
+                transcription = self.transcribe_job(job)
             except Exception as e:
-                notification.notify(
+                metrics.count('tray.errors')
+                self.notify(
                     title='Voice Input Error',
                     message=f'Error: {str(e)}',
                     timeout=3
                 )
-                # Clean up temp file
-                mp3_path.unlink(missing_ok=True)
+            finally:
+                self.deliver(job, transcription)
+    
+    def transcribe_job(self, job: dict):
+        """Encode and transcribe one finished recording"""
+        segmenter, encoder, pcm = job['segmenter'], job['encoder'], job['pcm']
+        codec = AudioConverter.codec(self.config.get('codec', 'opus'))
+        job['codec'], job['bitrate'] = codec.name, self.bitrate
+        if segmenter:
+            # Earlier segments were already transcribed while recording
+            transcription = segmenter.finish()
+            if segmenter.policy:
+                job['codec'], job['bitrate'] = 'auto', None
+            if job['keep']:
+                job['path'] = self.save_recording(codec.encode(pcm, job['sample_rate'], job['channels'], self.bitrate), codec.suffix)
+        else:
+            # Encode in memory (already done, as MP3, while recording in stream mode)
+            if encoder:
+                audio, suffix = encoder.finish(), '.mp3'
+                job['codec'] = 'mp3'
+            elif self.policy:
+                audio, suffix, choice = self.policy.encode(pcm, job['sample_rate'], job['channels'])
+                job['codec'], job['bitrate'] = choice['codec'], choice['bitrate']
+            else:
+                audio, suffix = codec.encode(pcm, job['sample_rate'], job['channels'], self.bitrate), codec.suffix
+            if job['keep']:
+                job['path'] = self.save_recording(audio, suffix)
+            
+            # Transcribe straight from memory
+            transcription = self.transcriber.transcribe(audio, f'recording{suffix}')
+        
+        removed = segmenter.removed_seconds if segmenter else job['removed']
+        if removed:
+            print(f"Removed {removed:.1f}s of silence before upload")
+        if not transcription:
+            self.notify(
+                title='Voice Input Error',
+                message='Transcription failed',
+                timeout=3
+            )
+        return transcription
+    
+    def deliver(self, job: dict, transcription):
+        """Paste finished jobs strictly in the order they were recorded"""
+        with self._jobs_lock:
+            self._finished[job['id']] = (job, transcription)
+        # Pasting takes a while, so only _paste_lock is held for it: stop
+        # can still take _jobs_lock to queue the next recording
+        with self._paste_lock:
+            while True:
+                with self._jobs_lock:
+                    if self._next_paste not in self._finished:
+                        break
+                    job, transcription = self._finished.pop(self._next_paste)
+                    self._next_paste += 1
+                    # The next recording may have segments waiting on this one
+                    held = self._held_segments.pop(self._next_paste, [])
+                if transcription and not job.get('incremental'):
+                    self.paste(transcription)
+                if transcription:
+                    metrics.observe('time_to_paste_seconds', time.perf_counter() - job['stopped_at'])
+                if self.catalog and 'stopped_at' in job:
+                    self.catalog.add(
+                        source='tray',
+                        path=str(job['path']) if job.get('path') else None,
+                        duration=job['duration'],
+                        codec=job.get('codec'),
+                        bitrate=job.get('bitrate'),
+                        language=self.transcriber.language,
+                        backend=self.transcriber.backend.name,
+                        latency=time.perf_counter() - job['stopped_at'],
+                        text=transcription
+                    )
+                for text in held:
+                    self.paste(text)
+        self.update_queue_depth()
+    
+    def paste_segment(self, job_id: int, text: str):
+        """Paste one transcript segment now, or hold it until earlier recordings are pasted"""
+        with self._paste_lock:
+            with self._jobs_lock:
+                current = job_id == self._next_paste
+                if job_id > self._next_paste:
+                    self._held_segments.setdefault(job_id, []).append(text)
+            if current:
+                self.paste(text)
+    
+    def paste(self, transcription: str):
+        with metrics.span('tray.paste', chars=len(transcription)):
+            # Copy to clipboard
+            pyperclip.copy(transcription)
+            
+            # Paste to active window
+            time.sleep(0.1)  # Small delay to ensure focus
+            
+            # Simulate Ctrl+V
+            keyboard.press_and_release('ctrl+v')
+    
+    @property
+    def queue_depth(self) -> int:
+        """Recordings stopped but not yet pasted"""
+        with self._jobs_lock:
+            return self._next_job - self._next_paste
+    
+    def update_queue_depth(self):
+        if not self.icon:
+            return
+        depth = self.queue_depth
+        hotkey_display = self.config.get('hotkey', 'ctrl+shift+r').upper().replace('+', ' + ')
+        self.icon.title = f"Voice Input - {depth} transcribing" if depth else f"Voice Input - Press {hotkey_display}"
+        self.icon.icon = self.create_icon_image(recording=self.recording, pending=depth)
+    
+    def save_recording(self, audio: bytes, suffix: str = '.mp3') -> Path:
+        """Write an encoded recording under ~/.parle/recordings"""
+        recordings_dir = self.config.config_dir / 'recordings'
+        recordings_dir.mkdir(parents=True, exist_ok=True)
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        path = recordings_dir / f"recording_{timestamp}{suffix}"
+        path.write_bytes(audio)
+        self.last_recording = path
+        return path
+    
+    def play_last_recording(self, icon, item):
+        """Play the last saved recording without blocking the tray"""
+        if not self.last_recording or not self.last_recording.exists():
+            notification.notify(
+                title='Voice Input',
+                message='No saved recording yet (enable keep_recordings in the config)',
+                timeout=3
+            )
+            return
+        # The shared engine keeps the output device open between plays
+        engine = AudioPlayer.engine()
+        engine.stop()
+        engine.play(self.last_recording)
     
     def on_hotkey(self):
         """Handle hotkey press"""
@@ -188,8 +515,15 @@ class VoiceInputTray:
         """Quit the application"""
         if self.recording:
             self.recording = False
-            if self.recorder:
+            if self.recorder and self.recorder is not self.armed_recorder:
                 self.recorder.cleanup()
+            if self.encoder:
+                self.encoder.abort()
+            if self.segmenter:
+                self.segmenter.cancel()
+        self.disarm()
+        self.transcriber.close()
+        AudioPlayer.shutdown()
         icon.stop()
         sys.exit(0)
     
@@ -285,6 +619,7 @@ class VoiceInputTray:
             return pystray.Menu(
                 pystray.MenuItem(f"Voice Input - {hotkey_display}", lambda: None, enabled=False),
                 pystray.MenuItem("Start/Stop Recording", self.toggle_recording),
+                pystray.MenuItem("Play Last Recording", self.play_last_recording),
                 pystray.Menu.SEPARATOR,
                 pystray.MenuItem(startup_text, self.toggle_startup),
                 pystray.MenuItem("Change Hotkey", self.change_hotkey),
@@ -301,6 +636,12 @@ class VoiceInputTray:
             create_menu()
         )
         
+        # Open the API connection now and keep it warm between dictations
+        self.transcriber.start_keepalive(self.config.get('keepalive_interval', 45))
+        
+        if self.config.get('always_armed', False):
+            self.arm()
+        
         # Register hotkey using keyboard library
         self.current_hotkey = hotkey
         keyboard.add_hotkey(hotkey, self.on_hotkey, suppress=False)
@@ -0,0 +1,111 @@
+from typing import List, Tuple
+
+import numpy as np
+
+
+def frame_rms(samples: np.ndarray, frame_size: int) -> np.ndarray:
+    """RMS level of each consecutive ``frame_size`` block (a partial tail is dropped)."""
+    count = len(samples) // frame_size
+    if count == 0:
+        return np.zeros(0, dtype=np.float32)
+    frames = samples[:count * frame_size].reshape(count, frame_size).astype(np.float32)
+    return np.sqrt(np.mean(frames * frames, axis=1))
+
+
+def is_silent(samples: np.ndarray, threshold: float) -> bool:
+    """True if the RMS level of ``samples`` is below ``threshold``."""
+    if len(samples) == 0:
+        return True
+    level = samples.astype(np.float32)
+    return float(np.sqrt(np.mean(level * level))) < threshold
+
+
+class SilenceCompactor:
+    """Trim leading/trailing silence and shorten long pauses in 16-bit PCM.
+
+    Levels are measured per ``frame_ms`` block. Silence at either end is cut
+    down to ``padding`` seconds and any internal pause longer than
+    ``max_pause`` seconds is shortened to ``max_pause``.
+    """
+
+    def __init__(self, threshold: float = 500, max_pause: float = 0.5, padding: float = 0.1, frame_ms: int = 20):
+        self.threshold = threshold
+        self.max_pause = max_pause
+        self.padding = padding
+        self.frame_ms = frame_ms
+
+    def compact(self, samples: np.ndarray, sample_rate: int, channels: int = 1) -> Tuple[np.ndarray, float]:
+        """Return the compacted samples and the number of seconds removed."""
+        frame_size = max(1, sample_rate * self.frame_ms // 1000) * channels
+        levels = frame_rms(samples, frame_size)
+        count = len(levels)
+        if count == 0:
+            return samples, 0.0
+        
+        voiced = levels >= self.threshold
+        if not voiced.any():
+            return samples[:0], len(samples) / (sample_rate * channels)
+        
+        index = np.arange(count)
+        prev_voiced = np.maximum.accumulate(np.where(voiced, index, -1))
+        next_voiced = np.minimum.accumulate(np.where(voiced, index, count)[::-1])[::-1]
+        since = index - prev_voiced
+        until = next_voiced - index
+        
+        frames_per_second = 1000 / self.frame_ms
+        pad = int(round(self.padding * frames_per_second))
+        half_pause = int(round(self.max_pause * frames_per_second / 2))
+        
+        leading = prev_voiced < 0
+        trailing = next_voiced >= count
+        internal = ~(leading | trailing)
+        keep = (
+            voiced
+            | (leading & (until <= pad))
+            | (trailing & (since <= pad))
+            | (internal & ((since <= half_pause) | (until <= half_pause)))
+        )
+        
+        mask = np.repeat(keep, frame_size)
+        # The partial frame at the end follows the decision for the last frame
+        mask = np.concatenate([mask, np.full(len(samples) - len(mask), keep[-1])])
+        compacted = samples[mask]
+        removed = (len(samples) - len(compacted)) / (sample_rate * channels)
+        return compacted, removed
+
+
+def split_at_pauses(samples: np.ndarray, sample_rate: int, max_segment: float, threshold: float = 500,
+                    frame_ms: int = 20, overlap: float = 1.0) -> List[Tuple[int, int, bool]]:
+    """Plan cuts that split mono PCM into segments no longer than ``max_segment`` seconds.
+
+    Each cut goes in the middle of the longest pause in the second half of
+    the allowed window. Where there is no pause at all, the cut goes at the
+    quietest frame and the next segment starts ``overlap`` seconds earlier so
+    no word is lost. Returns ``(start, end, overlaps_previous)`` sample ranges.
+    """
+    frame_size = max(1, sample_rate * frame_ms // 1000)
+    levels = frame_rms(samples, frame_size)
+    max_frames = max(2, int(max_segment * 1000 / frame_ms))
+    overlap_frames = min(int(overlap * 1000 / frame_ms), max_frames // 4)
+
+    segments = []
+    start = 0
+    overlapped = False
+    while len(levels) - start > max_frames:
+        low = start + max_frames // 2
+        window = levels[low:start + max_frames]
+        silent = np.concatenate([[False], window < threshold, [False]])
+        edges = np.flatnonzero(np.diff(silent.astype(np.int8)))
+        if len(edges):
+            run_starts, run_ends = edges[0::2], edges[1::2]
+            # Longest pause wins; among equals, the latest one
+            best = len(run_starts) - 1 - int(np.argmax((run_ends - run_starts)[::-1]))
+            cut = low + (run_starts[best] + run_ends[best]) // 2
+            segments.append((start * frame_size, cut * frame_size, overlapped))
+            start, overlapped = cut, False
+        else:
+            cut = low + int(np.argmin(window))
+            segments.append((start * frame_size, cut * frame_size, overlapped))
+            start, overlapped = cut - overlap_frames, overlap_frames > 0
+    segments.append((start * frame_size, len(samples), overlapped))
+    return segments
@@ -0,0 +1,50 @@
+import numpy as np
+import pytest
+
+from parle.adaptive import BitratePolicy, LinkEstimator
+from parle.fake_server import FakeTranscriptionServer
+from parle.transcriber import AudioTranscriber
+
+
+def tone(seconds: float, sample_rate: int = 16000) -> bytes:
+    t = np.arange(int(seconds * sample_rate)) / sample_rate
+    noise = np.random.default_rng(0).normal(0, 200, len(t))
+    return (3000 * np.sin(2 * np.pi * 220 * t) + noise).astype(np.int16).tobytes()
+
+
+def test_server_time_is_not_blamed_on_the_link():
+    link = LinkEstimator(throughput=256 * 1024)
+    # Same format every time: a slow server looks just like a slow link
+    for _ in range(5):
+        link.record_upload(20 * 1024, 10.0, 1.5)
+    estimate = link.estimate()
+    assert not estimate['identified']
+    assert estimate['throughput'] == 256 * 1024
+
+
+def test_fit_separates_transfer_from_server_time():
+    link = LinkEstimator()
+    throughput, per_second = 50 * 1024, 0.1
+    for size, seconds in [(20_000, 10), (200_000, 10), (60_000, 30), (400_000, 20)]:
+        link.record_upload(size, seconds, 0.4 + per_second * seconds + size / throughput)
+    estimate = link.estimate()
+    assert estimate['identified']
+    assert estimate['throughput'] == pytest.approx(throughput, rel=0.01)
+    assert estimate['per_second'] == pytest.approx(per_second, rel=0.01)
+
+
+@pytest.mark.parametrize('throughput, lossless', [(None, True), (16 * 1024, False)])
+def test_choice_follows_throughput(throughput, lossless):
+    server = FakeTranscriptionServer(port=0, latency=0.5, throughput=throughput).start()
+    transcriber = AudioTranscriber(backend='local', api_url=server.url, max_retries=0, max_segment=None)
+    policy = BitratePolicy(transcriber.link)
+    pcm = tone(2.0)
+    try:
+        for _ in range(5):
+            data, suffix, choice = policy.encode(pcm, 16000, 1)
+            assert transcriber.transcribe(data, 'clip' + suffix)
+    finally:
+        transcriber.close()
+        server.stop()
+    assert transcriber.link.estimate()['identified']
+    assert (choice['codec'] == 'flac') == lossless
@@ -0,0 +1,161 @@
+import io
+import json
+import time
+import wave
+
+import numpy as np
+import pytest
+
+from parle.batch import BatchTranscriber
+from parle.cache import TranscriptionCache
+from parle.converter import AudioConverter
+from parle.fake_server import FakeTranscriptionServer
+from parle.transcriber import AudioTranscriber
+
+
+def pcm(seconds: float = 1.0, seed: int = 0) -> bytes:
+    return np.random.default_rng(seed).normal(0, 3000, int(seconds * 16000)).astype(np.int16).tobytes()
+
+
+def flac(seconds: float = 1.0, seed: int = 0) -> bytes:
+    return AudioConverter.encode_pcm(pcm(seconds, seed), 16000, 1, 'flac')
+
+
+def wav(seconds: float = 1.0, seed: int = 0) -> bytes:
+    output = io.BytesIO()
+    with wave.open(output, 'wb') as wf:
+        wf.setnchannels(1)
+        wf.setsampwidth(2)
+        wf.setframerate(16000)
+        wf.writeframes(pcm(seconds, seed))
+    return output.getvalue()
+
+
+@pytest.fixture
+def serve():
+    servers = []
+
+    def start(**options):
+        server = FakeTranscriptionServer(port=0, **options).start()
+        servers.append(server)
+        return server
+
+    yield start
+    for server in servers:
+        server.stop()
+
+
+def transcriber_for(server, **options):
+    options.setdefault('backoff_base', 0.01)
+    return AudioTranscriber(backend='local', api_url=server.url, max_segment=None, **options)
+
+
+def test_success_records_one_attempt(serve):
+    server = serve()
+    transcriber = transcriber_for(server)
+    assert transcriber.transcribe(flac(), 'clip.flac').startswith('This is a fake transcript.')
+    assert [attempt['status'] for attempt in transcriber.last_attempts] == [200]
+    assert transcriber.last_attempts[0]['elapsed'] > 0
+
+
+def test_retries_on_503(serve):
+    server = serve(error_rate=1.0, error_status=503)
+    transcriber = transcriber_for(server, max_retries=2)
+    assert transcriber.transcribe(flac(), 'clip.flac') is None
+    assert server.requests == 3
+    assert [attempt['status'] for attempt in transcriber.last_attempts] == [503, 503, 503]
+
+
+def test_gives_up_on_client_errors(serve):
+    server = serve(error_rate=1.0, error_status=400)
+    transcriber = transcriber_for(server, max_retries=3)
+    assert transcriber.transcribe(flac(), 'clip.flac') is None
+    assert server.requests == 1
+    assert [attempt['status'] for attempt in transcriber.last_attempts] == [400]
+
+
+def test_waits_for_retry_after(serve):
+    server = serve(error_rate=1.0, error_status=429, retry_after=0.5)
+    transcriber = transcriber_for(server, max_retries=1, backoff_base=0.0)
+    started = time.perf_counter()
+    assert transcriber.transcribe(flac(), 'clip.flac') is None
+    assert time.perf_counter() - started >= 0.5
+    assert server.requests == 2
+
+
+def test_backoff_honours_retry_after():
+    transcriber = AudioTranscriber(backend='local', api_url='http://127.0.0.1:9')
+    assert transcriber._backoff(0, '2') == 2.0
+    # Capped, so a hostile header can't stall a recording for long
+    assert transcriber._backoff(0, '3600') == 60.0
+    assert transcriber._backoff(0, 'Wed, 21 Oct 2015 07:28:00 GMT') == 0.0
+    # Unparseable: back to full-jitter exponential backoff
+    assert 0.0 <= transcriber._backoff(3, 'soon') <= transcriber.backoff_max
+
+
+def test_cache_hit_skips_upload(serve, tmp_path):
+    server = serve()
+    cache = TranscriptionCache(tmp_path / 'cache')
+    transcriber = transcriber_for(server, cache=cache)
+    audio = flac()
+    first = transcriber.transcribe(audio, 'clip.flac')
+    assert (cache.hits, cache.misses) == (0, 1)
+    assert transcriber.transcribe(audio, 'clip.flac') == first
+    assert (cache.hits, cache.misses) == (1, 1)
+    assert server.requests == 1
+    assert transcriber.last_attempts == []
+    # Other audio is a miss
+    transcriber.transcribe(flac(seed=1), 'clip.flac')
+    assert server.requests == 2
+
+
+def test_cache_key_ignores_the_container(serve, tmp_path):
+    server = serve()
+    cache = TranscriptionCache(tmp_path / 'cache')
+    assert cache.key(flac(), 'fr', 'model') == cache.key(wav(), 'fr', 'model')
+    assert cache.key(flac(), 'fr', 'model') != cache.key(wav(seed=1), 'fr', 'model')
+    transcriber = transcriber_for(server, cache=cache)
+    first = transcriber.transcribe(flac(), 'clip.flac')
+    assert transcriber.transcribe(wav(), 'clip.wav') == first
+    assert server.requests == 1
+
+
+def test_batch_resumes_where_it_stopped(serve, tmp_path):
+    server = serve()
+    files = []
+    for index in range(3):
+        path = tmp_path / f"clip_{index}.flac"
+        path.write_bytes(flac(seed=index))
+        files.append(path)
+    output = tmp_path / 'transcripts.jsonl'
+    # An interrupted run: one success, one failure and a torn last line
+    with open(output, 'w', encoding='utf-8') as f:
+        f.write(json.dumps({'file': str(files[0]), 'text': 'done already'}) + '\n')
+        f.write(json.dumps({'file': str(files[1]), 'text': None, 'error': 'transcription failed'}) + '\n')
+        f.write('{"file": "')
+
+    batch = BatchTranscriber(transcriber_for(server), output, workers=2)
+    stats = batch.run(files)
+    assert (stats['skipped'], stats['ok'], stats['failed']) == (1, 2, 0)
+    assert server.requests == 2
+
+    stats = batch.run(files)
+    assert (stats['skipped'], stats['ok']) == (3, 0)
+    assert server.requests == 2
+
+
+def test_batch_rate_limits_every_request(serve, tmp_path):
+    server = serve(error_rate=1.0, error_status=503)
+    files = []
+    for index in range(2):
+        path = tmp_path / f"clip_{index}.flac"
+        path.write_bytes(flac(seed=index))
+        files.append(path)
+    transcriber = transcriber_for(server, max_retries=2, backoff_base=0.0)
+    batch = BatchTranscriber(transcriber, tmp_path / 'transcripts.jsonl', workers=2, rate=10)
+    started = time.perf_counter()
+    stats = batch.run(files)
+    # Six requests, retries included, at most ten per second
+    assert server.requests == 6
+    assert stats['failed'] == 2
+    assert time.perf_counter() - started >= 0.5